@@ -0,0 +1,257 @@
+"""
+性能基准：在模拟 I2C 总线上让各 App 跑固定帧数，统计
+帧耗时分位数、每帧 I2C 事务/字节数、每帧内存分配和峰值堆，
+结果保存为 JSON，方便不同提交之间对比（见 tools/bench_compare.py）。
+基准期间 App 里的 sleep 不真睡、只记时长，帧耗时只含计算和总线，
+请求的睡眠另记在 sleep_us_per_frame。
+
+设备上运行：
+    import bench
+    bench.run(frames=200, label="abc1234")
+"""
+import gc, json, random, time
+from fakebus import FakeI2C
+import main
+from main import GameContext
+
+TEXTS = {
+    "short": "Hi!",
+    "long": "MicroPython cyber necklace, 9x16 LED matrix. " * 8,
+    "cjk": "赛博项链测试中文滚动显示效果" * 4,
+}
+
+
+class _Done(Exception):
+    pass
+
+
+class Clock:
+    """
+    替换 main 模块里的 time（内置模块的属性改不了）：ticks 照常，
+    sleep 系列只累计请求的微秒数。
+    """
+
+    def __init__(self):
+        self.ticks_us = time.ticks_us
+        self.ticks_ms = time.ticks_ms
+        self.ticks_diff = time.ticks_diff
+        self.slept_us = 0
+
+    def sleep(self, s):
+        self.slept_us += int(s * 1000000)
+
+    def sleep_ms(self, ms):
+        self.slept_us += int(ms) * 1000
+
+    def sleep_us(self, us):
+        self.slept_us += int(us)
+
+
+class Recorder:
+    """挂到 GameContext.on_frame 上，逐帧采样。"""
+
+    def __init__(self, bus, frames, clock):
+        self.bus = bus
+        self.frames = frames
+        self.clock = clock
+        self.times = []
+        self.tx = []
+        self.nbytes = []
+        self.allocs = []
+        self.sleeps = []
+        self.peak = 0
+        self.first_us = 0
+        self.start()
+
+    def start(self):
+        gc.collect()
+        gc.disable()
+        self.bus.reset_stats()
+        self.clock.slept_us = 0
+        self.a0 = gc.mem_alloc()
+        self.t0 = time.ticks_us()
+
+    def __call__(self):
+        t = time.ticks_diff(time.ticks_us(), self.t0)
+        a = gc.mem_alloc()
+        if a > self.peak:
+            self.peak = a
+        if self.first_us == 0:
+            # 第一帧包含 App 的初始化（读文件等），单独记录
+            self.first_us = t
+        else:
+            self.times.append(t)
+            self.allocs.append(a - self.a0)
+            self.tx.append(self.bus.tx)
+            self.nbytes.append(self.bus.nbytes)
+            self.sleeps.append(self.clock.slept_us)
+            if len(self.times) >= self.frames:
+                raise _Done
+        self.start()
+
+    def result(self):
+        n = len(self.times) or 1
+        return {
+            "frames": len(self.times),
+            "first_frame_us": self.first_us,
+            "frame_us": summarize(self.times),
+            "i2c_tx_per_frame": sum(self.tx) / n,
+            "i2c_bytes_per_frame": sum(self.nbytes) / n,
+            "alloc_per_frame": sum(self.allocs) / n,
+            "sleep_us_per_frame": sum(self.sleeps) / n,
+            "peak_heap": self.peak,
+        }
+
+
+def summarize(values):
+    if not values:
+        return {}
+    s = sorted(values)
+    n = len(s)
+
+    def pct(p):
+        return s[min(n - 1, n * p // 100)]
+
+    return {
+        "p50": pct(50),
+        "p90": pct(90),
+        "p99": pct(99),
+        "max": s[-1],
+        "mean": sum(s) // n,
+    }
+
+
+def _write_text(name, text):
+    with open(name, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _remove_store():
+    import os
+    for name in os.listdir():
+        if name.startswith("_bench_msgs"):
+            os.remove(name)
+
+
+def _scroll_store(ctx, texts):
+    # 不给文件名的默认路径：消息库（空库时回退到 content.txt）
+    from msgstore import MessageStore
+    _remove_store()
+    store = MessageStore("_bench_msgs")
+    for text in texts:
+        store.append(text.encode())
+    saved = ctx._store, ctx._msg
+    ctx._store, ctx._msg = store, 0
+    try:
+        ctx.app_scroll_text()
+    finally:
+        ctx._store, ctx._msg = saved
+
+
+def _apps():
+    apps = [
+        ("fire", lambda ctx: ctx.app_fire()),
+    ]
+    for kind in TEXTS:
+        name = "_bench_%s.txt" % kind
+        apps.append(("scroll_" + kind,
+                     lambda ctx, name=name: ctx.app_scroll_text(name)))
+    apps.append(("scroll_store_empty", lambda ctx: _scroll_store(ctx, ())))
+    apps.append(("scroll_store", lambda ctx: _scroll_store(ctx, TEXTS.values())))
+    apps.append(("tetris_ai", lambda ctx: ctx.app_tetris_ai()))
+    apps.append(("race", lambda ctx: ctx.app_race()))
+    apps.append(("charging", lambda ctx: ctx.charging_loop()))
+    return apps
+
+
+def run(frames=200, out="bench.json", label="", only=None):
+    import os
+    bus = FakeI2C()
+    ctx = GameContext(bus)
+    # 充电动画在电量 > 0 时立即退出，基准里固定为 0
+    ctx.read_battery_level = lambda: 0
+
+    for kind, text in TEXTS.items():
+        _write_text("_bench_%s.txt" % kind, text)
+
+    clock = Clock()
+    real_time = main.time
+    main.time = clock
+    results = {}
+    try:
+        for name, app in _apps():
+            if only and name not in only:
+                continue
+            random.seed(1)
+            rec = Recorder(bus, frames, clock)
+            ctx.on_frame = rec
+            try:
+                app(ctx)
+            except _Done:
+                pass
+            finally:
+                ctx.on_frame = None
+                gc.enable()
+            results[name] = r = rec.result()
+            print("%-18s p50 %6d us  p99 %6d us  i2c %5d tx %6d B  alloc %6d B  sleep %6d us"
+                  % (name, r["frame_us"].get("p50", 0), r["frame_us"].get("p99", 0),
+                     r["i2c_tx_per_frame"], r["i2c_bytes_per_frame"],
+                     r["alloc_per_frame"], r["sleep_us_per_frame"]))
+    finally:
+        main.time = real_time
+        for kind in TEXTS:
+            try:
+                os.remove("_bench_%s.txt" % kind)
+            except OSError:
+                pass
+        _remove_store()
+
+    report = {"label": label, "frames": frames, "apps": results}
+    if out:
+        with open(out, "w") as f:
+            json.dump(report, f)
+    return report
+
+
+def run_tiled(frames=200, panels=4, out="bench_tiled.json"):
+    """
+    多片拼接：在 panels 个模拟芯片（0x74 起）上横向滚动一段 16 列宽的图案，
+    统计每片每帧的 I2C 事务和字节数，检查只有内容变化的芯片才有总线流量。
+    """
+    import is31
+    addresses = tuple(range(0x74, 0x74 + panels))
+    bus = FakeI2C(addresses)
+    disp = is31.TiledMatrix.row(bus, addresses)
+    w, h = disp.width, disp.height
+    buf = bytearray(w * h)
+    bus.reset_stats()
+    times = []
+    for k in range(frames):
+        t0 = time.ticks_us()
+        for i in range(len(buf)):
+            buf[i] = 0
+        # 16 列宽的斜纹从右往左滚过整条屏
+        for x in range(16):
+            sx = w - 1 - (k % (w + 16)) + x
+            if 0 <= sx < w:
+                for y in range(h):
+                    if (x + y) % 4 == 0:
+                        buf[y * w + sx] = 100
+        disp.blit(buf)
+        times.append(time.ticks_diff(time.ticks_us(), t0))
+    chips = {}
+    for addr in addresses:
+        dev = bus.devices[addr]
+        chips["0x%02x" % addr] = {
+            "i2c_tx_per_frame": dev.tx / frames,
+            "i2c_bytes_per_frame": dev.nbytes / frames,
+        }
+    report = {"frames": frames, "panels": panels, "frame_us": summarize(times),
+              "i2c_bytes_per_frame": bus.nbytes / frames, "chips": chips}
+    for name, c in chips.items():
+        print("%s  i2c %5.2f tx %7.1f B per frame" % (name, c["i2c_tx_per_frame"],
+                                                      c["i2c_bytes_per_frame"]))
+    if out:
+        with open(out, "w") as f:
+            json.dump(report, f)
+    return report
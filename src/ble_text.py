@@ -1,32 +1,170 @@
 import bluetooth
+import binascii
+import micropython
+import os
+import struct
+
+# 分帧流式协议（写在 RX 特征上，每次 GATT 写入一个包）
+#   START  0x01 <u32 总长度> <u32 crc32> [<u8 字体> <u8 亮度>]
+#   CHUNK  0x02 <u16 序号> <数据>
+#   END    0x03
+#   ABORT  0x04
+# 首字节不是以上命令的写入按旧方式当作一条完整文本处理。
+#
+# 应答（TX 特征 notify）
+#   b"K" <u16 每包最大数据长度> <u8 窗口>   START 已接受
+#   b"A" <u16 序号>                        已收到该序号及之前的所有包
+#   b"E" <u8 错误码>                        出错，本次传输作废
+#   b"SAVED"                               已校验并写入文件
+# 发送端每发 WINDOW 个 CHUNK 等一次 "A"，以此做流控。
+CMD_START = 0x01
+CMD_CHUNK = 0x02
+CMD_END = 0x03
+CMD_ABORT = 0x04
+
+ERR_STATE = 1
+ERR_SEQ = 2
+ERR_LENGTH = 3
+ERR_CRC = 4
+ERR_IO = 5
+
+WINDOW = 8
+MTU = 247
+RX_BUFFER = 512
+RING_SIZE = 4096
+
+# 环形缓冲中的记录类型
+_EV_CONN = 1
+_EV_DISC = 2
+_EV_WRITE = 3
+
+
+class _Ring:
+    """
+    单生产者（BLE IRQ）/ 单消费者（主循环）的字节环，预先分配、无锁。
+    记录格式：<u8 类型> <u16 长度> <数据>。head 只由生产者写，tail 只由消费者写。
+    """
+
+    def __init__(self, size):
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.size = size
+        self.head = 0
+        self.tail = 0
+
+    def _copy_in(self, pos, data):
+        n = len(data)
+        first = min(n, self.size - pos)
+        data = memoryview(data)
+        self.mv[pos:pos + first] = data[:first]
+        if first < n:
+            self.mv[0:n - first] = data[first:]
+        return (pos + n) % self.size
+
+    def put(self, kind, data=b""):
+        n = len(data)
+        used = (self.head - self.tail) % self.size
+        if used + n + 3 >= self.size:
+            return False
+        buf = self.buf
+        h = self.head
+        buf[h] = kind
+        h = (h + 1) % self.size
+        buf[h] = n & 0xff
+        h = (h + 1) % self.size
+        buf[h] = n >> 8
+        h = (h + 1) % self.size
+        if n:
+            h = self._copy_in(h, data)
+        # 数据写完才移动 head，消费者看到的总是完整记录
+        self.head = h
+        return True
+
+    def get(self, out):
+        """取出一条记录到 out，返回 (类型, 长度)，没有则返回 None。"""
+        t = self.tail
+        if t == self.head:
+            return None
+        buf = self.buf
+        size = self.size
+        kind = buf[t]
+        n = buf[(t + 1) % size] | buf[(t + 2) % size] << 8
+        t = (t + 3) % size
+        first = min(n, size - t)
+        mv = self.mv
+        out[0:first] = mv[t:t + first]
+        if first < n:
+            out[first:n] = mv[0:n - first]
+        self.tail = (t + n) % size
+        return kind, n
+
 
 class BLETextReceiver:
-    def __init__(self, device_name="MPY-LED-BLE", callback=None):
+    def __init__(self, device_name="MPY-LED-BLE", callback=None, path=None,
+                 on_packet=None, store=None, auto_poll=True):
         """
         callback(event, data)
         events:
             "conn"     - BLE连接
             "disc"     - BLE断开
-            "text"     - 收到字符串 data=str
+            "text"     - 收到字符串 data=str（未指定 path 时）
+            "start"    - 开始分帧传输 data=总字节数
+            "saved"    - 已写入 path/store data=字节数
+            "error"    - 传输失败 data=错误码
+
+        path: 指定后，文本边收边写入临时文件，校验通过后原子改名为 path，
+              接收端不在内存中保存整段文本。
+
+        store: msgstore.MessageStore，指定后文本直接追加进消息库（代替 path），
+              校验通过才写索引；START 里可选的字体/亮度一并记进索引。
+
+        on_packet(pkt): 指定后，非文本协议的写入不再当作文本，而是原样交给它
+              （memoryview，只在调用期间有效），用于实时帧流等二进制协议。
+
+        auto_poll: False 时 IRQ 不再用 micropython.schedule 触发 poll()，
+              事件只在 App 自己调用 poll() 时处理。回调要写 App 正在用的缓冲
+              （如帧流直接解码进 fb_buf）时用，避免在 App 代码中间被打断。
         """
         self.callback = callback
         self.device_name = device_name
+        self.path = path
+        self.on_packet = on_packet
+        self.store = store
+        self.auto_poll = auto_poll
 
         self._IRQ_CENTRAL_CONNECT = 1
         self._IRQ_CENTRAL_DISCONNECT = 2
         self._IRQ_GATTS_WRITE = 3
+        self._IRQ_MTU_EXCHANGED = 21
+
+        self.mtu = 23
+        self._file = None
+        self._reset_stream()
+
+        # IRQ 里只把原始数据拷进环，解析/写文件/应答都在主上下文里做
+        self._ring = _Ring(RING_SIZE)
+        self._rx = bytearray(RX_BUFFER)
+        self._rx_mv = memoryview(self._rx)
+        self._scheduled = False
+        self._polling = False
+        self._process_ref = self._process_scheduled
+        self.dropped = 0
 
         self._init_ble()
 
     def _init_ble(self):
         self.ble = bluetooth.BLE()
         self.ble.active(True)
+        try:
+            self.ble.config(mtu=MTU)
+        except:
+            pass
 
         UART = bluetooth.UUID("6E400001-B5A3-F393-E0A9-E50E24DCCA9E")
         UART_TX = bluetooth.UUID("6E400003-B5A3-F393-E0A9-E50E24DCCA9E")
         UART_RX = bluetooth.UUID("6E400002-B5A3-F393-E0A9-E50E24DCCA9E")
 
-        flags = bluetooth.FLAG_WRITE
+        flags = bluetooth.FLAG_WRITE | bluetooth.FLAG_WRITE_NO_RESPONSE
         notify = bluetooth.FLAG_NOTIFY
 
         services = (
@@ -35,6 +173,8 @@ class BLETextReceiver:
 
         handles = self.ble.gatts_register_services(services)
         self.tx_handle, self.rx_handle = handles[0]
+        # 默认 20 字节，放大到能装下一个 MTU 的写入
+        self.ble.gatts_set_buffer(self.rx_handle, RX_BUFFER)
 
         self.conn_handle = None
 
@@ -45,36 +185,261 @@ class BLETextReceiver:
 
     def _make_payload(self, name):
         p = bytearray()
-        p.extend(bytes((len(name) + 1, 0x09))) 
+        p.extend(bytes((len(name) + 1, 0x09)))
         p.extend(name.encode())
         return p
 
+    def _emit(self, event, data=None):
+        if self.callback:
+            self.callback(event, data)
+
     def _irq(self, event, data):
         if event == self._IRQ_CENTRAL_CONNECT:
             self.conn_handle, *_ = data
-            if self.callback:
-                self.callback("conn", None)
+            self._ring.put(_EV_CONN)
 
         elif event == self._IRQ_CENTRAL_DISCONNECT:
             self.conn_handle = None
-            self.ble.gap_advertise(100_000, self._make_payload(self.device_name))
-            if self.callback:
-                self.callback("disc", None)
+            self.mtu = 23
+            self._ring.put(_EV_DISC)
+
+        elif event == self._IRQ_MTU_EXCHANGED:
+            _, self.mtu = data
+            return
 
         elif event == self._IRQ_GATTS_WRITE:
             conn, value_handle = data
-            if value_handle == self.rx_handle:
-                raw = self.ble.gatts_read(self.rx_handle)
+            if value_handle != self.rx_handle:
+                return
+            if not self._ring.put(_EV_WRITE, self.ble.gatts_read(self.rx_handle)):
+                # 环满：丢弃，之后的序号校验会让发送端知道
+                self.dropped += 1
+        else:
+            return
+        self._schedule()
+
+    def _schedule(self):
+        if self.auto_poll and not self._scheduled:
+            try:
+                micropython.schedule(self._process_ref, None)
+                self._scheduled = True
+            except RuntimeError:
+                # 调度队列满，等下一次 IRQ 或 poll()
+                pass
+
+    def _process_scheduled(self, _):
+        self._scheduled = False
+        self.poll()
+
+    def poll(self):
+        """在主上下文中处理环里积压的事件，App 主循环里也可以直接调用。"""
+        if self._polling:
+            # 调度的回调打断了 App 主循环里正在进行的 poll()：
+            # 环和 _rx 还在被外层使用，新记录由外层那次接着取
+            return
+        ring = self._ring
+        rx = self._rx_mv
+        self._polling = True
+        try:
+            while True:
+                rec = ring.get(self._rx)
+                if rec is None:
+                    break
+                kind, n = rec
+                if kind == _EV_WRITE:
+                    self._on_write(rx[:n])
+                elif kind == _EV_CONN:
+                    self._emit("conn")
+                elif kind == _EV_DISC:
+                    self._abort()
+                    self.ble.gap_advertise(100_000, self._make_payload(self.device_name))
+                    self._emit("disc")
+        finally:
+            self._polling = False
+        # 外层取完最后一条之后、清标志之前到的记录，交给下一次调度
+        if ring.head != ring.tail:
+            self._schedule()
+
+    # ---------------------------------------------------------------
+    #                           协议处理
+    # ---------------------------------------------------------------
+    def _on_write(self, raw):
+        if not raw:
+            return
+        cmd = raw[0]
+        if cmd == CMD_CHUNK:
+            self._on_chunk(raw)
+        elif cmd == CMD_START:
+            self._on_start(raw)
+        elif cmd == CMD_END:
+            self._on_end()
+        elif cmd == CMD_ABORT:
+            self._abort()
+        elif self.on_packet:
+            self.on_packet(raw)
+        else:
+            self._on_text(raw)
+
+    def _reset_stream(self):
+        self._total = 0
+        self._crc = 0
+        self._recv = 0
+        self._calc = 0
+        self._seq = 0
+        self._font = 0
+        self._bright = 0
+
+    def _tmp_path(self):
+        return self.path + ".tmp"
+
+    def _on_start(self, raw):
+        self._abort()
+        if self.path is None and self.store is None or len(raw) < 9:
+            self._error(ERR_STATE)
+            return
+        self._total, self._crc = struct.unpack_from("<II", raw, 1)
+        # 字体/亮度是后加的，旧客户端不发，0 表示默认
+        if len(raw) >= 11:
+            self._font = raw[9]
+            self._bright = raw[10]
+        try:
+            if self.store is not None:
+                self._file = self.store.begin()
+            else:
+                self._file = open(self._tmp_path(), "wb")
+        except OSError:
+            self._error(ERR_IO)
+            return
+        self._emit("start", self._total)
+        # 数据长度 = MTU - 3(ATT 头) - 3(命令+序号)
+        self.send(b"K" + struct.pack("<HB", self.mtu - 6, WINDOW))
+
+    def _on_chunk(self, raw):
+        f = self._file
+        # 对端发来的任何包都不能让 poll() 抛异常
+        if f is None or len(raw) < 3:
+            self._error(ERR_STATE)
+            return
+        seq = raw[1] | raw[2] << 8
+        if seq != self._seq:
+            self._error(ERR_SEQ)
+            return
+        data = memoryview(raw)[3:]
+        self._recv += len(data)
+        if self._recv > self._total:
+            self._error(ERR_LENGTH)
+            return
+        try:
+            f.write(data)
+        except OSError:
+            self._error(ERR_IO)
+            return
+        self._calc = binascii.crc32(data, self._calc)
+        self._seq = (seq + 1) & 0xffff
+        if self._seq % WINDOW == 0:
+            self.send(b"A" + struct.pack("<H", seq))
+
+    def _on_end(self):
+        f = self._file
+        if f is None:
+            self._error(ERR_STATE)
+            return
+        self._file = None
+        f.close()
+        if self._recv != self._total:
+            self._error(ERR_LENGTH)
+            return
+        if self._calc & 0xffffffff != self._crc:
+            self._error(ERR_CRC)
+            return
+        try:
+            if self.store is not None:
+                self.store.commit(self._recv, self._crc, self._font, self._bright)
+            else:
+                self._commit(self._tmp_path())
+        except OSError:
+            self._error(ERR_IO)
+            return
+        n = self._recv
+        last = (self._seq - 1) & 0xffff
+        self._reset_stream()
+        self.send(b"A" + struct.pack("<H", last))
+        self.send(b"SAVED")
+        self._emit("saved", n)
+
+    def _on_text(self, raw):
+        # 旧客户端：一次写入就是一条完整文本
+        if self.path is None and self.store is None:
+            raw = bytes(raw)
+            try:
+                text = raw.decode()
+            except:
+                text = raw.decode("latin1")
+            self._emit("text", text)
+            self.send(b"SAVED")
+            return
+        try:
+            if self.store is not None:
+                self.store.append(bytes(raw))
+            else:
+                with open(self._tmp_path(), "wb") as f:
+                    f.write(raw)
+                self._commit(self._tmp_path())
+        except OSError:
+            self._error(ERR_IO)
+            return
+        self.send(b"SAVED")
+        self._emit("saved", len(raw))
+
+    def _commit(self, tmp):
+        try:
+            os.rename(tmp, self.path)
+        except OSError:
+            # 部分文件系统不允许覆盖已有文件
+            os.remove(self.path)
+            os.rename(tmp, self.path)
+
+    def _abort(self):
+        f = self._file
+        if f is not None:
+            self._file = None
+            f.close()
+            if self.store is None:
                 try:
-                    text = raw.decode()
-                except:
-                    text = raw.decode("latin1")
-
-                if self.callback:
-                    self.callback("text", text)
-
-                if self.conn_handle:
-                    try:
-                        self.ble.gatts_notify(self.conn_handle, self.tx_handle, b"SAVED")
-                    except:
-                        pass
+                    os.remove(self._tmp_path())
+                except OSError:
+                    pass
+        if self.store is not None:
+            self.store.abort()
+        self._reset_stream()
+
+    def _error(self, code):
+        self._abort()
+        self.send(b"E" + bytes([code]))
+        self._emit("error", code)
+
+    def close(self):
+        """App 退出时调用：断开连接、停止广播，之后到的事件不再处理。"""
+        self.callback = None
+        self.on_packet = None
+        self.ble.irq(None)
+        if self.conn_handle is not None:
+            try:
+                self.ble.gap_disconnect(self.conn_handle)
+            except:
+                pass
+            self.conn_handle = None
+        self.ble.gap_advertise(None)
+        self._abort()
+        # 丢掉积压的记录，已排队的调度回调取不到东西
+        self._ring.tail = self._ring.head
+
+    def send(self, data):
+        """通过 TX 特征 notify 发送，未连接时丢弃。"""
+        if self.conn_handle is None:
+            return False
+        try:
+            self.ble.gatts_notify(self.conn_handle, self.tx_handle, data)
+            return True
+        except:
+            return False
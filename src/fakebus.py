@@ -0,0 +1,77 @@
+_BANK_ADDRESS = 0xfd
+
+
+class FakeIS31:
+    """
+    内存中模拟的 IS31FL3731：按 bank 保存寄存器，支持地址自增写入。
+    """
+
+    def __init__(self):
+        self.bank = 0
+        self.banks = {}
+        self.tx = 0
+        self.nbytes = 0
+
+    def _mem(self, bank):
+        mem = self.banks.get(bank)
+        if mem is None:
+            mem = self.banks[bank] = bytearray(256)
+        return mem
+
+    def write(self, reg, buf):
+        if reg == _BANK_ADDRESS:
+            self.bank = buf[0]
+            return
+        mem = self._mem(self.bank)
+        mem[reg:reg + len(buf)] = buf
+
+    def read(self, reg, n):
+        if reg == _BANK_ADDRESS:
+            return bytes([self.bank])
+        mem = self._mem(self.bank)
+        return bytes(mem[reg:reg + n])
+
+
+class FakeI2C:
+    """
+    模拟 I2C 总线，接口与 machine.I2C 的 *_mem 方法一致。
+    可挂多个设备，统计总线及每个设备的事务次数与字节数（含地址和寄存器字节）。
+    """
+
+    def __init__(self, addresses=(0x74,)):
+        self.devices = {}
+        for addr in addresses:
+            self.devices[addr] = FakeIS31()
+        self.tx = 0
+        self.nbytes = 0
+
+    def _device(self, addr):
+        dev = self.devices.get(addr)
+        if dev is None:
+            raise OSError(19)       # ENODEV，与真实总线无应答一致
+        return dev
+
+    def writeto_mem(self, addr, reg, buf):
+        dev = self._device(addr)
+        n = len(buf) + 2
+        self.tx += 1
+        self.nbytes += n
+        dev.tx += 1
+        dev.nbytes += n
+        dev.write(reg, buf)
+
+    def readfrom_mem(self, addr, reg, n):
+        dev = self._device(addr)
+        cost = n + 3                # 写地址+寄存器，再读地址+数据
+        self.tx += 1
+        self.nbytes += cost
+        dev.tx += 1
+        dev.nbytes += cost
+        return dev.read(reg, n)
+
+    def reset_stats(self):
+        self.tx = 0
+        self.nbytes = 0
+        for dev in self.devices.values():
+            dev.tx = 0
+            dev.nbytes = 0
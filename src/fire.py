@@ -0,0 +1,136 @@
+"""
+火焰帧源。两种实现接口相同：render(buf, stride) 把一帧画进 fb_buf
+（7x15 区域，占 fb 的第 1..15 行、第 1..7 列，与原 app_fire 的位置一致）。
+
+    AnimPlayer - 回放录制的 anim.bin
+    Fire       - 程序生成（热扩散），不读文件、每帧不分配内存
+"""
+W = 7
+H = 15
+
+
+def _rand8(seed):
+    # xorshift32，只在生成查找表时用，设备和电脑上结果一致
+    s = seed or 1
+    while True:
+        s ^= (s << 13) & 0xffffffff
+        s ^= s >> 17
+        s ^= (s << 5) & 0xffffffff
+        yield s & 0xff
+
+
+class AnimPlayer:
+    """
+    anim.bin 格式：每帧 <x1:4 y1:4> <x2:4 y2:4> 两字节包围框，
+    后跟框内逐行的亮度，框外为 0；首字节 >= 0x90 表示结束，回到开头。
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self._hdr = bytearray(2)
+        self._px = bytearray(W * H)
+
+    def _read(self, mv):
+        f = self.f
+        n = f.readinto(mv)
+        if n != len(mv):
+            f.seek(0)
+            f.readinto(mv)
+
+    def render(self, buf, stride):
+        hdr = self._hdr
+        self._read(hdr)
+        if hdr[0] >= 0x90:
+            self.f.seek(0)
+            self._read(hdr)
+        x1, y1 = hdr[0] >> 4, hdr[0] & 0x0F
+        x2, y2 = hdr[1] >> 4, hdr[1] & 0x0F
+        bw = x2 - x1 + 1
+        px = self._px
+        self._read(memoryview(px)[:bw * (y2 - y1 + 1)])
+
+        # 动画第 y 行画到 fb 第 H-y 行，x 镜像到 fb 第 W-x 列
+        i = 0
+        for y in range(H):
+            base = (H - y) * stride + W
+            if y1 <= y <= y2:
+                for x in range(W):
+                    if x1 <= x <= x2:
+                        buf[base - x] = px[i]
+                        i += 1
+                    else:
+                        buf[base - x] = 0
+            else:
+                for x in range(W):
+                    buf[base - x] = 0
+
+
+class Fire:
+    """
+    热扩散火焰：底部随机点火，热量向上平流并与邻格平均，逐格冷却。
+    冷却量 = 位置偏置（越高、越靠边冷得越快）+ 预生成的随机表，
+    亮度由预计算的调色板查表，热量缓冲是固定大小的 bytearray。
+    """
+
+    def __init__(self, cooling=6, sparking=220, seed=1):
+        rnd = _rand8(seed)
+        n = W * H
+        self.heat = bytearray(n)            # 第 0 行是火焰根部
+        self.cool = bytearray(256)
+        for i in range(256):
+            self.cool[i] = next(rnd) * cooling >> 8
+        self.bias = bytearray(n)
+        for y in range(H):
+            for x in range(W):
+                edge = abs(2 * x - (W - 1))         # 0（中间）.. W-1（两边）
+                self.bias[y * W + x] = min(255, y + edge * edge)
+        self.spark = bytearray(256)
+        for i in range(256):
+            self.spark[i] = 160 + (next(rnd) * 95 >> 8) \
+                if next(rnd) < sparking else 0
+        self.palette = bytearray(256)
+        for i in range(256):
+            # 低热量压暗，和录制动画的亮度分布接近
+            self.palette[i] = min(255, i * i // 96)
+        self._ci = 0
+        self._si = 0
+
+    def step(self):
+        heat = self.heat
+        cool = self.cool
+        bias = self.bias
+        ci = self._ci
+
+        # 向上扩散：每格取下方三格与下下格的加权平均
+        for y in range(H - 1, 0, -1):
+            row = y * W
+            below = row - W
+            below2 = below - W if y > 1 else below
+            for x in range(W):
+                l = heat[below + x - 1] if x > 0 else 0
+                r = heat[below + x + 1] if x < W - 1 else 0
+                v = (heat[below + x] * 2 + heat[below2 + x] + l + r) // 5
+                v -= bias[row + x] + cool[ci]
+                ci = (ci + 1) & 0xff
+                heat[row + x] = v if v > 0 else 0
+
+        # 根部点火
+        spark = self.spark
+        si = self._si
+        for x in range(W):
+            v = (heat[x] * 3 + spark[si]) >> 2
+            v -= bias[x]
+            heat[x] = v if v > 0 else 0
+            si = (si + 7) & 0xff
+        self._si = (si + 1) & 0xff
+        self._ci = ci
+
+    def render(self, buf, stride):
+        self.step()
+        heat = self.heat
+        pal = self.palette
+        for y in range(H):
+            base = (H - y) * stride + W
+            row = y * W
+            for x in range(W):
+                buf[base - x] = pal[heat[row + x]]
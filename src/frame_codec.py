@@ -0,0 +1,112 @@
+"""
+实时帧流的编解码，设备（MicroPython）和电脑（CPython）共用。
+
+帧是 9x16 = 144 字节的亮度值，顺序与 GameContext.fb_buf 相同（行优先）。
+每个包以类型字节开头，后跟 <u8 帧号>：
+    PKT_RAW    0x10 <id> <144 字节>
+    PKT_RLE    0x12 <id> (<u8 重复次数> <u8 亮度>)...
+    PKT_DELTA  0x11 <id> <u8 基准帧号> (<u8 索引> <u8 亮度>)...
+增量帧只在设备当前帧号等于基准帧号时应用，否则丢弃并请求关键帧。
+"""
+
+FRAME_SIZE = 144
+
+PKT_RAW = 0x10
+PKT_DELTA = 0x11
+PKT_RLE = 0x12
+
+
+def encode_full(frame, fid):
+    """返回 RAW 和 RLE 中较短的一种。"""
+    out = bytearray((PKT_RLE, fid & 0xff))
+    n = len(frame)
+    i = 0
+    while i < n:
+        v = frame[i]
+        j = i + 1
+        while j < n and j - i < 255 and frame[j] == v:
+            j += 1
+        out.append(j - i)
+        out.append(v)
+        i = j
+        if len(out) >= n + 2:
+            return bytes((PKT_RAW, fid & 0xff)) + bytes(frame)
+    return bytes(out)
+
+
+def encode_delta(frame, prev, fid, prev_id):
+    out = bytearray((PKT_DELTA, fid & 0xff, prev_id & 0xff))
+    for i in range(len(frame)):
+        v = frame[i]
+        if v != prev[i]:
+            out.append(i)
+            out.append(v)
+    return bytes(out)
+
+
+def encode(frame, prev=None, fid=0, prev_id=0, limit=None):
+    """
+    选最短的编码；prev 为接收端当前帧（None 时只发关键帧）。
+    limit 为单包最大长度（MTU - 3），超过时返回 None。
+    """
+    pkt = encode_full(frame, fid)
+    if prev is not None:
+        d = encode_delta(frame, prev, fid, prev_id)
+        if len(d) < len(pkt):
+            pkt = d
+    if limit is not None and len(pkt) > limit:
+        return None
+    return pkt
+
+
+class FrameDecoder:
+    """把包直接解码进 buf（通常就是 fb_buf），不分配中间帧。"""
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.fid = -1           # 当前帧号，-1 表示还没有有效关键帧
+        self.received = 0
+        self.rejected = 0
+
+    def decode(self, pkt):
+        """成功返回 True；增量帧基准不符或包损坏时返回 False（应请求关键帧）。"""
+        n = len(pkt)
+        if n < 2:
+            self.rejected += 1
+            return False
+        kind = pkt[0]
+        buf = self.buf
+        if kind == PKT_RAW:
+            if n != FRAME_SIZE + 2:
+                self.rejected += 1
+                return False
+            buf[0:FRAME_SIZE] = pkt[2:]
+        elif kind == PKT_RLE:
+            # 先校验总长，避免半帧写进屏幕
+            total = 0
+            for i in range(2, n - 1, 2):
+                total += pkt[i]
+            if n & 1 or total != FRAME_SIZE:
+                self.rejected += 1
+                return False
+            pos = 0
+            for i in range(2, n, 2):
+                run = pkt[i]
+                v = pkt[i + 1]
+                for j in range(pos, pos + run):
+                    buf[j] = v
+                pos += run
+        elif kind == PKT_DELTA:
+            if n < 3 or not n & 1 or pkt[2] != self.fid:
+                self.rejected += 1
+                return False
+            for i in range(3, n, 2):
+                idx = pkt[i]
+                if idx < FRAME_SIZE:
+                    buf[idx] = pkt[i + 1]
+        else:
+            self.rejected += 1
+            return False
+        self.fid = pkt[1]
+        self.received += 1
+        return True
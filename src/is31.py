@@ -1,5 +1,5 @@
-import math
 import time
+from array import array
 
 _MODE_REGISTER = const(0x00)
 _FRAME_REGISTER = const(0x01)
@@ -28,18 +28,54 @@ _COLOR_OFFSET = const(0x24)
 class Matrix:
     """
     Driver for the IS31FL3731 charlieplexed 16x9 LED matrix.
+
+    ``rotation`` (0/90/180/270, clockwise) and ``mirror`` (flip logical x)
+    select the logical orientation; with 90/270 the matrix is 9x16.
+    Both are baked into a logical-index -> register-offset table at
+    construction, shared by ``pixel()`` and ``blit()``.
     """
 
-    width = 16
-    height = 9
+    phys_width = 16
+    phys_height = 9
 
-    def __init__(self, i2c, address=0x74, rotate_180=False):
+    def __init__(self, i2c, address=0x74, rotate_180=False, rotation=0,
+                 mirror=False):
         self.i2c = i2c
         self.address = address
-        self.rotate_180 = rotate_180     # ★ 新增：旋转 180°
+        if rotate_180:
+            rotation = 180
+        self.rotate_180 = rotation == 180
+        self._build_map(rotation, mirror)
         self.reset()
         self.init()
 
+    def _build_map(self, rotation, mirror):
+        pw, ph = self.phys_width, self.phys_height
+        if rotation in (0, 180):
+            w, h = pw, ph
+        elif rotation in (90, 270):
+            w, h = ph, pw
+        else:
+            raise ValueError("Rotation out of range")
+        self.width = w
+        self.height = h
+        self.rotation = rotation
+        self.mirror = mirror
+        self._map = bytearray(w * h)
+        self._out = bytearray(w * h)
+        for y in range(h):
+            for x in range(w):
+                lx = w - 1 - x if mirror else x
+                if rotation == 0:
+                    px, py = lx, y
+                elif rotation == 90:
+                    px, py = pw - 1 - y, lx
+                elif rotation == 180:
+                    px, py = pw - 1 - lx, ph - 1 - y
+                else:
+                    px, py = y, ph - 1 - lx
+                self._map[x + y * w] = px + py * pw
+
     def _bank(self, bank=None):
         if bank is None:
             return self.i2c.readfrom_mem(self.address, _BANK_ADDRESS, 1)[0]
@@ -58,10 +94,16 @@ class Matrix:
         """Initialize the display."""
         self._mode(_PICTURE_MODE)
         self.frame(0)
+        # Enable (18), blink (18) and PWM (144) registers are contiguous:
+        # set all LEDs on, blink off and PWM 0 with one burst per frame.
+        data = bytearray(_COLOR_OFFSET + self.phys_width * self.phys_height)
+        for col in range(18):
+            data[_ENABLE_OFFSET + col] = 0xff
         for frame in range(8):
-            self.fill(0, False, frame=frame)
-            for col in range(18):
-                self._register(frame, _ENABLE_OFFSET + col, 0xff)
+            self._bank(frame)
+            self.i2c.writeto_mem(self.address, _ENABLE_OFFSET, data)
+        # Shadow of each frame's blink bits, so blink updates never read back.
+        self._blink = [bytearray(18) for _ in range(8)]
         self.audio_sync(False)
 
     def reset(self):
@@ -88,24 +130,38 @@ class Matrix:
         self._register(_CONFIG_BANK, _AUTOPLAY2_REGISTER, delay % 64)
         self._mode(_AUTOPLAY_MODE | self._frame)
 
+    @staticmethod
+    def _log2_steps(ms, unit, name):
+        # Time = unit * 2**n, n in 0..7; pick the nearest n.
+        if not unit / 2 <= ms <= unit * 128 * 3 // 2:
+            raise ValueError(name + " out of range")
+        best = 0
+        for n in range(1, 8):
+            if abs((unit << n) - ms) < abs((unit << best) - ms):
+                best = n
+        return best
+
     def fade(self, fade_in=None, fade_out=None, pause=0):
+        """
+        Enable breathing with fade-in/fade-out times (26 ms * 2**n, up to
+        3328 ms) and extinguish time (3.5 ms * 2**n, up to 448 ms); times are
+        rounded to the nearest step. With no times, breathing is disabled.
+        Returns the actual (fade_in, fade_out, pause) times in ms.
+        """
         if fade_in is None and fade_out is None:
             self._register(_CONFIG_BANK, _BREATH2_REGISTER, 0)
+            return None
         elif fade_in is None:
             fade_in = fade_out
         elif fade_out is None:
             fade_out = fade_in
-        fade_in = int(math.log(fade_in / 26, 2))
-        fade_out = int(math.log(fade_out / 26, 2))
-        pause = int(math.log(pause / 26, 2))
-        if not 0 <= fade_in <= 7:
-            raise ValueError("Fade in out of range")
-        if not 0 <= fade_out <= 7:
-            raise ValueError("Fade out out of range")
-        if not 0 <= pause <= 7:
-            raise ValueError("Pause out of range")
-        self._register(_CONFIG_BANK, _BREATH1_REGISTER, fade_out << 4 | fade_in)
-        self._register(_CONFIG_BANK, _BREATH2_REGISTER, 1 << 4 | pause)
+        fi = self._log2_steps(fade_in, 26, "Fade in")
+        fo = self._log2_steps(fade_out, 26, "Fade out")
+        # Extinguish step is 3.5 ms; work in half-milliseconds.
+        p = self._log2_steps(max(pause, 3.5) * 2, 7, "Pause")
+        self._register(_CONFIG_BANK, _BREATH1_REGISTER, fo << 4 | fi)
+        self._register(_CONFIG_BANK, _BREATH2_REGISTER, 1 << 4 | p)
+        return 26 << fi, 26 << fo, (7 << p) / 2
 
     def frame(self, frame=None, show=True):
         if frame is None:
@@ -156,16 +212,47 @@ class Matrix:
                 self.i2c.writeto_mem(self.address,
                                      _COLOR_OFFSET + row * 24, data)
         if blink is not None:
+            bits = self._blink[frame]
             data = bool(blink) * 0xff
             for col in range(18):
-                self._register(frame, _BLINK_OFFSET + col, data)
+                bits[col] = data
+            self.i2c.writeto_mem(self.address, _BLINK_OFFSET, bits)
+
+    def blink_mask(self, mask, frame=None):
+        """
+        Set every pixel's blink bit from a logical ``width * height`` buffer
+        (non-zero = blink), remapped through the orientation table and
+        written in one burst.
+        """
+        if frame is None:
+            frame = self._frame
+        bits = self._blink[frame]
+        for col in range(18):
+            bits[col] = 0
+        m = self._map
+        for i in range(len(m)):
+            if mask[i]:
+                a = m[i]
+                bits[a >> 3] |= 1 << (a & 7)
+        self._bank(frame)
+        self.i2c.writeto_mem(self.address, _BLINK_OFFSET, bits)
+
+    def blit(self, buf, frame=None):
+        """
+        Remap a logical ``width * height`` buffer (row-major) through the
+        orientation table in one pass and write it in one burst.
+        """
+        if frame is None:
+            frame = self._frame
+        out = self._out
+        m = self._map
+        for i in range(len(m)):
+            out[m[i]] = buf[i]
+        self._bank(frame)
+        self.i2c.writeto_mem(self.address, _COLOR_OFFSET, out)
 
-    # ★★★ 新增旋转 180° 的坐标映射 ★★★
     def _pixel_addr(self, x, y):
-        if self.rotate_180:  
-            x = self.width - 1 - x
-            y = self.height - 1 - y
-        return x + y * 16
+        return self._map[x + y * self.width]
 
     def pixel(self, x, y, color=None, blink=None, frame=None):
         if not 0 <= x < self.width:
@@ -187,9 +274,115 @@ class Matrix:
 
         if blink is not None:
             addr, bit = divmod(pixel, 8)
-            bits = self._register(frame, _BLINK_OFFSET + addr)
+            bits = self._blink[frame]
             if blink:
-                bits |= 1 << bit
+                bits[addr] |= 1 << bit
+            else:
+                bits[addr] &= ~(1 << bit)
+            self._register(frame, _BLINK_OFFSET + addr, bits[addr])
+
+
+class TiledMatrix:
+    """
+    Several IS31FL3731 panels (e.g. 0x74-0x77 on one bus) presented as one
+    logical framebuffer of ``width * height`` bytes.
+
+    ``tiles`` is a list of ``(matrix, x, y)`` giving each panel's logical
+    origin. ``blit()`` packs every panel's region straight into chip order
+    with one precomputed gather table per panel and only writes panels
+    whose packed bytes differ from what was last sent to that frame.
+    """
+
+    def __init__(self, tiles):
+        self.tiles = tiles
+        self.width = max(x + m.width for m, x, y in tiles)
+        self.height = max(y + m.height for m, x, y in tiles)
+        self._gather = []
+        self._out = []
+        self._sent = []
+        for m, ox, oy in tiles:
+            # chip register offset -> global logical index
+            g = array("H", range(len(m._map)))
+            for ly in range(m.height):
+                for lx in range(m.width):
+                    g[m._map[lx + ly * m.width]] = (ox + lx) + (oy + ly) * self.width
+            self._gather.append(g)
+            self._out.append(bytearray(len(g)))
+            self._sent.append({})
+
+    @classmethod
+    def row(cls, i2c, addresses=(0x74, 0x75, 0x76, 0x77), **kwargs):
+        """Panels side by side, left to right in ``addresses`` order."""
+        tiles = []
+        x = 0
+        for address in addresses:
+            m = Matrix(i2c, address, **kwargs)
+            tiles.append((m, x, 0))
+            x += m.width
+        return cls(tiles)
+
+    def blit(self, buf, frame=None):
+        """Returns the number of panels actually written."""
+        written = 0
+        for t in range(len(self.tiles)):
+            m = self.tiles[t][0]
+            f = m._frame if frame is None else frame
+            g = self._gather[t]
+            out = self._out[t]
+            for a in range(len(g)):
+                out[a] = buf[g[a]]
+            sent = self._sent[t].get(f)
+            if sent is not None and sent == out:
+                continue
+            m._bank(f)
+            m.i2c.writeto_mem(m.address, _COLOR_OFFSET, out)
+            if sent is None:
+                self._sent[t][f] = bytearray(out)
             else:
-                bits &= ~(1 << bit)
-            self._register(frame, _BLINK_OFFSET + addr, bits)
+                sent[:] = out
+            written += 1
+        return written
+
+    def fill(self, color=None, blink=None, frame=None):
+        for t in range(len(self.tiles)):
+            m = self.tiles[t][0]
+            m.fill(color, blink, frame)
+            if color is not None:
+                f = m._frame if frame is None else frame
+                self._sent[t][f] = bytearray([color] * len(self._out[t]))
+
+    def pixel(self, x, y, color=None, blink=None, frame=None):
+        for t in range(len(self.tiles)):
+            m, ox, oy = self.tiles[t]
+            if ox <= x < ox + m.width and oy <= y < oy + m.height:
+                if color is not None:
+                    # written behind blit()'s back: force the next blit
+                    self._sent[t].pop(m._frame if frame is None else frame, None)
+                return m.pixel(x - ox, y - oy, color, blink, frame)
+
+    def blink_mask(self, mask, frame=None):
+        for m, ox, oy in self.tiles:
+            part = bytearray(m.width * m.height)
+            for ly in range(m.height):
+                base = (oy + ly) * self.width + ox
+                for lx in range(m.width):
+                    part[lx + ly * m.width] = mask[base + lx]
+            m.blink_mask(part, frame)
+
+    def frame(self, frame=None, show=True):
+        if frame is None:
+            return self.tiles[0][0].frame()
+        for m, _, _ in self.tiles:
+            m.frame(frame, show)
+
+    def fade(self, fade_in=None, fade_out=None, pause=0):
+        result = None
+        for m, _, _ in self.tiles:
+            result = m.fade(fade_in, fade_out, pause)
+        return result
+
+    def blink(self, rate=None):
+        if rate is None:
+            return self.tiles[0][0].blink()
+        for m, _, _ in self.tiles:
+            m.blink(rate)
@@ -1,12 +1,20 @@
+import time
+_BOOT_US = time.ticks_us()
 import is31
 from machine import SoftI2C, Pin, ADC
-import time, random, framebuf ,math
-from ble_text import BLETextReceiver
+import random, framebuf ,math
+import os
 
 class GameContext:
     WIDTH = 9
     HEIGHT = 16
 
+    # 帧分段（与 profiler.UPDATE/RENDER/FLUSH/SLEEP 一致）
+    ST_UPDATE = 0
+    ST_RENDER = 1
+    ST_FLUSH = 2
+    ST_SLEEP = 3
+
     VREF = 3.3
     DIV_RATIO = 2.0
     FULL = 4.20
@@ -22,6 +30,14 @@ class GameContext:
     LANE_B = 5
     ENEMY_SPEED = 1
 
+    LOW_BATT = 15           # 低于该电量时开机电量显示闪烁
+
+    TRANSITION_MS = 208     # App 切换时的淡出/淡入时间（26 ms * 2^n）
+    BLANK_FRAME = 2         # 始终为空的芯片帧，淡出后停在这里
+
+    FIRE_MODE = "anim"      # "anim" 录制动画 / "proc" 程序生成
+    FIRE_FPS = 60           # 程序生成火焰的帧率
+
     CAR_SHAPE = [
         [0,1,0],
         [1,1,1],
@@ -30,11 +46,19 @@ class GameContext:
     ]
 
 
-    def __init__(self):
-        # 显示
-        i2c = SoftI2C(scl=Pin(1), sda=Pin(0))
-        self.display = is31.Matrix(i2c, rotate_180=True)
-        self.display.fill(0)
+    def __init__(self, i2c=None):
+        # 启动耗时分段，首帧刷出后打印一次
+        self._boot = [("start", _BOOT_US), ("import", time.ticks_us())]
+
+        # 显示（i2c 可由外部传入，例如基准测试用的模拟总线）
+        if i2c is None:
+            i2c = SoftI2C(scl=Pin(1), sda=Pin(0))
+        # 竖屏 9x16：方向置换表由驱动在构造时生成
+        self.display = is31.Matrix(i2c, rotation=90)
+        # 芯片帧 0/1 轮流显示内容，淡出后下一次 flush 写进另一帧再淡入
+        self._page = 0
+        self._fade_in_ms = 0
+        self._boot.append(("matrix", time.ticks_us()))
 
         # 按键
         self.key = Pin(9, Pin.IN, Pin.PULL_UP)
@@ -53,11 +77,15 @@ class GameContext:
         # framebuf
         self.fb_buf = bytearray(self.WIDTH * self.HEIGHT)
         self.fb = framebuf.FrameBuffer(self.fb_buf, self.WIDTH, self.HEIGHT, framebuf.GS8_V)
-        self.fb.font_load("font16.fon")
-        self.fb.font_set(0x22, 0, 1, 0)
-
-        # 动画
-        self.fire_file = open("anim.bin", "rb")
+        # 字库和动画文件都在第一次用到时再加载
+        self._font_loaded = False
+        self.fire_file = None
+        self._fire_anim = None
+        self._fire_proc = None
+        # 消息库（蓝牙收到的多条文字），同样按需打开；_msg 是下一条要滚动的序号
+        self._store = None
+        self._msg = 0
+        self._nocache = set()       # 超过 SCROLL_CACHE 列、不再尝试缓存的消息
 
         # 赛车状态
         self.player_lane = self.LANE_A
@@ -66,6 +94,13 @@ class GameContext:
         self.gap_count = random.randint(5, 16)
         self.shoulder_offset = 0
 
+        # 每帧回调（基准测试/调试用），None 时不调用
+        self.on_frame = None
+        # 性能剖析器，None 时关闭
+        self.prof = None
+        self._prof_ble = None
+
+        self._boot.append(("context", time.ticks_us()))
 
     # =====================================================================
     #                              工具函数
@@ -89,18 +124,146 @@ class GameContext:
         return False
 
 
-    def fb_show(self):
-        for y in range(self.HEIGHT):
-            for x in range(self.WIDTH):
-                idx = y * self.WIDTH + x
-                b = self.fb_buf[idx]
-                self.display.pixel(y, self.WIDTH - x - 1, b)
+    def set_profiler(self, mode=None, period_ms=1000):
+        """
+        运行时切换剖析：None 关闭，"overlay" / "print" / "ble"。
+        "ble" 平时通过 LED-PROF 发出；BLE App 运行期间改走该 App 的接收端（见 ble_open）。
+        """
+        if self.prof:
+            self.prof.close()
+            self.prof = None
+        if mode is None:
+            return
+        sink = None
+        if mode == "ble":
+            if self._prof_ble is None:
+                from ble_text import BLETextReceiver
+                self._prof_ble = BLETextReceiver("LED-PROF")
+            sink = self._prof_ble.send
+        from profiler import Profiler
+        self.prof = Profiler(self.display, mode, sink, period_ms)
+
+    def ble_open(self, name, **kwargs):
+        """
+        BLE App 用它创建接收端。bluetooth.BLE() 只有一个，IRQ 和广播同时只能归一个接收端：
+        先关掉剖析用的 LED-PROF，剖析的 BLE 输出改走这个 App 的接收端。
+        """
+        from ble_text import BLETextReceiver
+        if self._prof_ble is not None:
+            self._prof_ble.close()
+            self._prof_ble = None
+        ble = BLETextReceiver(name, **kwargs)
+        if self.prof and self.prof.mode == "ble":
+            self.prof.sink = ble.send
+        return ble
+
+    def ble_close(self, ble):
+        """App 退出时调用：关掉它的接收端，BLE 剖析开着的话重新广播 LED-PROF。"""
+        ble.close()
+        if self.prof and self.prof.mode == "ble":
+            from ble_text import BLETextReceiver
+            self._prof_ble = BLETextReceiver("LED-PROF")
+            self.prof.sink = self._prof_ble.send
+
+    def blink_start(self, mask=None, rate_ms=270):
+        """硬件闪烁：mask 为 fb 尺寸的缓冲（非 0 的像素闪），None 时整屏闪。"""
+        if mask is None:
+            self.display.fill(blink=True)
+        else:
+            self.display.blink_mask(mask)
+        self.display.blink(rate_ms)
+
+    def blink_stop(self):
+        self.display.blink(0)
+        self.display.fill(blink=False)
+
+    def font_set(self, *args):
+        if not self._font_loaded:
+            self.fb.font_load("font16.fon")
+            self._font_loaded = True
+        self.fb.font_set(*args)
+
+    def messages(self):
+        if self._store is None:
+            from msgstore import MessageStore
+            self._store = MessageStore()
+        return self._store
+
+    def _boot_report(self):
+        boot = self._boot
+        self._boot = None
+        boot.append(("first frame", time.ticks_us()))
+        line = "boot %d ms (%d ms since reset):" % (
+            time.ticks_diff(boot[-1][1], boot[0][1]) // 1000, time.ticks_ms())
+        for i in range(1, len(boot)):
+            line += " %s %d" % (boot[i][0], time.ticks_diff(boot[i][1], boot[i - 1][1]) // 1000)
+        print(line)
+
+    def mark(self, stage):
+        if self.prof:
+            self.prof.mark(stage)
+
+    def frame_end(self):
+        if self.prof:
+            self.prof.frame()
+        if self.on_frame:
+            self.on_frame()
+
+    def frame_sleep(self, seconds):
+        time.sleep(seconds)
+        if self.prof:
+            self.prof.mark(self.ST_SLEEP)
+        self.frame_end()
+
+    def flush(self):
+        """fb_buf -> 驱动按置换表一遍重排 -> 一次 I2C 批量写入。所有 App 共用这一条路径。"""
+        prof = self.prof
+        buf = self.fb_buf
+        if prof:
+            prof.mark(self.ST_RENDER)
+            if prof.mode == "overlay":
+                buf = prof.overlay(buf, self.WIDTH)
+        if self._fade_in_ms:
+            self._fade_in(buf)
+        else:
+            self.display.blit(buf)
+        if prof:
+            prof.mark(self.ST_FLUSH)
+        if self._boot:
+            self._boot_report()
+
+    def fade_out(self, ms=None, fade_in_ms=None):
+        """
+        用芯片呼吸把当前画面淡出到黑，然后停在空白帧；下一次 flush()
+        会把新画面写进备用帧并淡入（fade_in_ms，默认同 ms）。
+        呼吸周期从使能开始是：淡入 -> 淡出 -> 熄灭，这里淡入取最短 26 ms。
+        整个过程由芯片完成，CPU 只睡眠。
+        """
+        ms = ms or self.TRANSITION_MS
+        d = self.display
+        fi, fo, _ = d.fade(fade_in=26, fade_out=ms)
+        time.sleep_ms(fi + fo)
+        d.frame(self.BLANK_FRAME)
+        d.fade()
+        self._fade_in_ms = fade_in_ms or ms
+
+    def _fade_in(self, buf):
+        d = self.display
+        back = self._page ^ 1
+        d.blit(buf, frame=back)
+        # 淡出时间取最长，淡入结束时关掉呼吸，画面停在全亮
+        fi, _, _ = d.fade(fade_in=self._fade_in_ms, fade_out=3328)
+        d.frame(back)
+        self._page = back
+        self._fade_in_ms = 0
+        time.sleep_ms(fi)
+        d.fade()
 
     # =====================================================================
     #                            App：测试用不放入正式程序里
     # =====================================================================
     def app_charge(self):
-        self.fb.font_set(0x11, 0, 0, 0)
+        self.font_set(0x11, 0, 0, 0)
         cha = Pin(10,Pin.IN,Pin.PULL_UP)
         full = Pin(10,Pin.IN,Pin.PULL_UP)
         while 1:
@@ -109,68 +272,184 @@ class GameContext:
                 self.fb.text("c", 0, 0, 10)
             else:
                 self.fb.text("bc", 0, 0, 10)
-            self.fb_show()
+            self.flush()
             time.sleep(1)
             
     # =====================================================================
     #                               App：火焰动画
     # =====================================================================
-    def app_fire(self):
+    def app_fire(self, mode=None):
+        """mode: "anim" 回放 anim.bin，"proc" 程序生成；默认 FIRE_MODE。"""
+        import fire
         self.display.fill(0)
-        f = self.fire_file
-        w, h = 7, 15
-        delay = 0.015
-
-        def read_byte():
-            b = f.read(1)
-            if not b:
-                f.seek(0)
-                b = f.read(1)
-            return b[0]
+        if (mode or self.FIRE_MODE) == "proc":
+            if self._fire_proc is None:
+                self._fire_proc = fire.Fire()
+            src = self._fire_proc
+            period = 1000 // self.FIRE_FPS
+        else:
+            if self.fire_file is None:
+                self.fire_file = open("anim.bin", "rb")
+                self._fire_anim = fire.AnimPlayer(self.fire_file)
+            src = self._fire_anim
+            period = 0
+        buf = self.fb_buf
+        for i in range(len(buf)):
+            buf[i] = 0
 
         while True:
-            a = read_byte()
-            if a >= 0x90:
-                f.seek(0)
-                a = read_byte()
-
-            x1, y1 = a >> 4, a & 0x0F
-            a = read_byte()
-            x2, y2 = a >> 4, a & 0x0F
-
-            for y in range(h):
-                for x in range(w):
-                    if x1 <= x <= x2 and y1 <= y <= y2:
-                        color = read_byte()
-                    else:
-                        color = 0
-                    new_y = h - 1 - y
-                    self.display.pixel(new_y+1, x+1, color)
-
-            time.sleep(delay)
+            t0 = time.ticks_ms()
+            src.render(buf, self.WIDTH)
+            self.flush()
+
+            if period:
+                # 按 FIRE_FPS 定帧率，扣掉本帧已用时间
+                left = period - time.ticks_diff(time.ticks_ms(), t0)
+                self.frame_sleep(max(left, 0) / 1000)
+            else:
+                self.frame_sleep(0.015)
             if self.debounce_key(): break
 
 
     # =====================================================================
     #                             App：滚动文字
     # =====================================================================
-    def app_scroll_text(self, filename="content.txt"):
-        self.fb.font_set(0x22, 0, 1, 0)
-        try:
-            with open(filename, "r", encoding="utf-8") as f:
-                text = f.read().strip()
-        except:
-            text = "FILE ERROR"
+    SCROLL_RING = 32        # 列环形缓冲的列数，需 >= WIDTH + 最宽字形（16）
+    SCROLL_CACHE = 1024     # 列缓存的最大列数（每列 HEIGHT 字节），更长的消息不缓存
+
+    def app_scroll_text(self, filename=None):
+        """
+        逐字读取、逐列生成并滚动，内存和每帧耗时与文本长度无关。
+        虚拟列流 = WIDTH 列空白 + 文本各列；第 k 帧显示第 k .. k+WIDTH-1 列。
+
+        不给 filename 时轮流滚动消息库里的各条（每条滚完一遍换下一条），
+        第一遍渲染出的列存进缓存文件，之后直接读列；消息库为空时滚动 content.txt。
+        """
+        store = self.messages() if filename is None else None
+        W = self.WIDTH
+        H = self.HEIGHT
+        RING = self.SCROLL_RING
+        buf = self.fb_buf
+        fb = self.fb
+        ring = bytearray(RING * H)          # 列优先：第 n 列在 (n % RING) * H
+        glyph = bytearray(16 * H)           # 当前字形的各列
 
         def char_width(c):
             return 16 if '\u4e00' <= c <= '\u9fff' else 8
 
-        def fb_to_display():
+        def file_chars(filename):
+            try:
+                f = open(filename, "r", encoding="utf-8")
+            except:
+                yield from "FILE ERROR"
+                return
+            with f:
+                while True:
+                    c = f.read(1)
+                    if not c:
+                        return
+                    yield c
+
+        def read_chars(chars):
+            # 与原来的 strip() 一致：去掉首尾空白，中间的空白只记宽度、画成空列
+            pending = 0
+            started = False
+            for c in chars:
+                if c.isspace():
+                    if started:
+                        pending += 1
+                    continue
+                started = True
+                while pending:
+                    pending -= 1
+                    yield " "
+                yield c
+
+        def cached_columns(f):
+            # 缓存文件是按顺序排好的各列，每列 H 字节，直接读进环里
+            n = 0
+            mv = memoryview(ring)
+            with f:
+                while True:
+                    dst = (n % RING) * H
+                    if f.readinto(mv[dst:dst + H]) != H:
+                        return
+                    n += 1
+                    yield n
+
+        def columns(chars, bright, cache=None):
+            # 每个字先画进 fb（宽于屏幕的字分两次画），读出各列放进环里
+            if cache:
+                try:
+                    f = open(cache, "rb")
+                except OSError:
+                    f = None
+                if f is not None:
+                    chars.close()
+                    yield from cached_columns(f)
+                    return
+                out = open(cache + ".tmp", "wb")
+            else:
+                out = None
+            mv = memoryview(ring)
+            n = 0
+            try:
+                for c in read_chars(chars):
+                    w = char_width(c)
+                    if c == " ":
+                        for i in range(w * H):
+                            glyph[i] = 0
+                    else:
+                        for part in range(0, w, W):
+                            fb.fill(0)
+                            fb.text(c, -part, 0, bright)
+                            for x in range(min(W, w - part)):
+                                base = (part + x) * H
+                                for y in range(H):
+                                    glyph[base + y] = fb.pixel(x, y)
+                    for x in range(w):
+                        src = x * H
+                        dst = (n % RING) * H
+                        for y in range(H):
+                            ring[dst + y] = glyph[src + y]
+                        if out is not None:
+                            out.write(mv[dst:dst + H])
+                        n += 1
+                        yield n
+                    if out is not None and n > self.SCROLL_CACHE:
+                        # 记住这条放不下，之后每遍不再写 flash 再删掉
+                        out.close()
+                        out = None
+                        os.remove(cache + ".tmp")
+                        self._nocache.add(cache)
+                if out is not None:
+                    # 完整渲染完一遍才换上缓存
+                    out.close()
+                    out = None
+                    os.rename(cache + ".tmp", cache)
+            finally:
+                # 中途退出时关掉文本文件、丢掉没写完的缓存
+                chars.close()
+                if out is not None:
+                    out.close()
+                    os.remove(cache + ".tmp")
+
+        def compose(k, filled):
+            for sx in range(W):
+                j = k + sx - W
+                if 0 <= j < filled:
+                    base = (j % RING) * H
+                    for y in range(H):
+                        buf[y * W + sx] = ring[base + y]
+                else:
+                    for y in range(H):
+                        buf[y * W + sx] = 0
+
+        def apply_shadow():
             for y in range(self.HEIGHT):
                 for x in range(self.WIDTH):
                     idx = y * self.WIDTH + x
                     b = self.fb_buf[idx]
-                    self.display.pixel(y, self.WIDTH - x - 1, b)
 
                     shadow_x = x + 1
                     shadow_y = y + 1
@@ -185,23 +464,56 @@ class GameContext:
         key_was_pressed = False
 
         while not exit_flag:
-            text_width = sum(char_width(c) for c in text)
-            for offset in range(text_width + self.WIDTH):
-                self.fb.fill(0)
-                x = self.WIDTH - offset
-                for c in text:
-                    self.fb.text(c, x, 0, 60)
-                    x += char_width(c)
-
-                fb_to_display()
-                time.sleep(0.01)
+            # 每遍重新判断：消息库为空（新设备）时滚动 content.txt
+            if store is None or not len(store):
+                i = None
+                self.font_set(0x22, 0, 1, 0)
+                gen = columns(file_chars(filename or "content.txt"), 60)
+            else:
+                i = self._msg % len(store)
+                _, size, _, font, bright = store.entry(i)
+                self.font_set(font, 0, 1, 0)
+                cache = store.cache_path(i)
+                # 每字节至少 2 列（4 字节的字也有 8 列），按字节数就能判断放不下的长消息，
+                # 不必先写一遍临时文件（首尾空白多的消息最多只是不缓存）
+                if size * 2 > self.SCROLL_CACHE or cache in self._nocache:
+                    cache = None
+                gen = columns(store.chars(i), bright, cache)
+            filled = 0
+            done = False
+            k = 0
+            # 文本列数未知，读完后再滚 WIDTH 帧让最后一列移出屏幕
+            while not done or k < filled + W:
+                # 只生成到窗口最右一列为止
+                while not done and filled < k:
+                    try:
+                        filled = next(gen)
+                    except StopIteration:
+                        done = True
+                self.mark(self.ST_UPDATE)
+
+                compose(k, filled)
+                apply_shadow()
+                self.flush()
+                if store is not None:
+                    # 后台压缩：每帧搬一小段
+                    store.compact_step()
+                self.frame_sleep(0.01)
+                k += 1
 
                 # 按键检测：按下 -> 设置标志，抬起 -> 退出
                 if self.key.value() == 0:  # 按下
                     key_was_pressed = True
                 elif key_was_pressed and self.key.value() == 1:  # 松开
                     exit_flag = True
+                    gen.close()
                     break
+            else:
+                if store is not None:
+                    # 一条滚完：此时没有打开的文件，可以换上压缩后的文件
+                    store.swap()
+                if i is not None:
+                    self._msg = i + 1
     
     # =====================================================================
     #                            App：电池电量
@@ -267,6 +579,7 @@ class GameContext:
             if self.read_battery_level() > 0:
                 self.display.fill(0)
                 return
+            self.mark(self.ST_UPDATE)
 
             # ===== 每一帧都推进填充 =====
             fill += 1
@@ -302,15 +615,15 @@ class GameContext:
                 for x in range(xInL, xInR + 1):
                     self.fb_buf[y * W + x] = val
 
-            self.fb_show()
-            time.sleep(0.05)   # 现在会非常顺滑
+            self.flush()
+            self.frame_sleep(0.05)   # 现在会非常顺滑
 
 
 
 
             
     def app_battery(self):
-        self.fb.font_set(0x11, 1, 1, 0)
+        self.font_set(0x11, 1, 1, 0)
 
         lvl = self.read_battery_level()
 
@@ -325,9 +638,15 @@ class GameContext:
         self.fb.text(s[1], -3, 0, 100)
         self.fb.text(s[0], -3, 5, 100)
         self.fb.text("%", -3, 10, 100)
-        self.fb_show()
+        self.flush()
 
+        # 低电量：电量数字由芯片闪烁提示
+        low = lvl < self.LOW_BATT
+        if low:
+            self.blink_start()
         time.sleep(1.5)
+        if low:
+            self.blink_stop()
         self.display.fill(0)
 
 
@@ -337,8 +656,10 @@ class GameContext:
     def app_race(self):
 
         def draw_car(x, y, color):
+            # 4x3 的车用逐格循环就够快（sprite 对这么小的形状没有收益），
+            # 只补上 y < 0 的裁剪：刚生成的敌车不能画到缓冲末尾几行
             for dy in range(4):
-                if y + dy >= self.HEIGHT: continue
+                if y + dy < 0 or y + dy >= self.HEIGHT: continue
                 for dx in range(3):
                     if self.CAR_SHAPE[dy][dx]:
                         xx = x + dx
@@ -354,12 +675,6 @@ class GameContext:
                 self.fb_buf[y*self.WIDTH + 8] = col
             self.shoulder_offset = (self.shoulder_offset + 1) % 5
 
-        def fb_to_display():
-            for y in range(self.HEIGHT):
-                base = y * self.WIDTH
-                for x in range(self.WIDTH):
-                    self.display.pixel(y, self.WIDTH-x-1, self.fb_buf[base+x])
-
         def spawn_enemy():
             lane = self.LANE_A if random.getrandbits(1) == 0 else self.LANE_B
             self.enemy_list.append({"x": lane, "y": -4})
@@ -390,7 +705,7 @@ class GameContext:
             for e in self.enemy_list:
                 draw_car(e["x"], int(e["y"]), self.ENEMY_COLOR)
             draw_car(self.player_lane, self.player_y, self.CAR_COLOR)
-            fb_to_display()
+            self.flush()
 
         while True:
             if self.gap_count <= 0:
@@ -401,11 +716,14 @@ class GameContext:
 
             move_enemies()
             ai_update()
+            self.mark(self.ST_UPDATE)
             draw_all()
+            self.frame_end()
 
             if self.debounce_key(): break
             
     def app_tetris_ai(self):
+        from sprite import Sprite
         W = self.WIDTH     
         H = self.HEIGHT    
         FRAME_DELAY = 0.02
@@ -417,23 +735,19 @@ class GameContext:
         def clone_grid(g):
             return [row[:] for row in g]
 
-        def can_place(grid, shape, x, y):
-            sh = len(shape); sw = len(shape[0])
-            for ry in range(sh):
-                for rx in range(sw):
-                    if shape[ry][rx]:
-                        gx = x + rx; gy = y + ry
-                        if gx < 0 or gx >= W or gy < 0 or gy >= H: return False
-                        if grid[gy][gx] != 0: return False
+        # 方块都是 normalize 过的精灵，四边都有实心格，
+        # 所以越界判断用包围盒就够了，碰撞只查实心格
+        def can_place(grid, spr, x, y):
+            if x < 0 or x + spr.w > W or y < 0 or y + spr.h > H: return False
+            for rx, ry in spr.cells:
+                if grid[y + ry][x + rx] != 0: return False
             return True
 
-        def place_on(grid, shape, x, y, val):
-            for ry in range(len(shape)):
-                for rx in range(len(shape[0])):
-                    if shape[ry][rx]:
-                        gx = x + rx; gy = y + ry
-                        if 0 <= gx < W and 0 <= gy < H:
-                            grid[gy][gx] = val
+        def place_on(grid, spr, x, y, val):
+            for rx, ry in spr.cells:
+                gx = x + rx; gy = y + ry
+                if 0 <= gx < W and 0 <= gy < H:
+                    grid[gy][gx] = val
 
         def clear_lines(grid):
             new = []
@@ -494,7 +808,7 @@ class GameContext:
             'L':[[0,0,1],[1,1,1]]
         }
 
-        PIECES = {k:rotations(v) for k,v in TETROMINO.items()}
+        PIECES = {k:[Sprite(r) for r in rotations(v)] for k,v in TETROMINO.items()}
 
         # ---------- 评估与 AI ----------
         def count_holes(g):
@@ -528,7 +842,7 @@ class GameContext:
             best_move=None
             best_score=-999999
             for ri,shape in enumerate(PIECES[key]):
-                sh=len(shape); sw=len(shape[0])
+                sw=shape.w
                 for x in range(-sw+1, W):
                     y=0
                     if not can_place(grid, shape, x, y): continue
@@ -542,45 +856,31 @@ class GameContext:
                         best_move = (ri, x, y)
             return best_move
 
-        def compose_pixels(grid, shape=None, pos=None, val=120):
-            pixels = [[0]*W for _ in range(H)]
+        def draw_board(grid, shape=None, pos=None, val=120):
+            # 俄罗斯方块在屏上是左右镜像的，写入 fb 时翻转 x
+            buf = self.fb_buf
             for y in range(H):
+                row = grid[y]
+                base = y * W + W - 1
                 for x in range(W):
-                    if grid[y][x]:
-                        pixels[y][x] = grid[y][x]
- 
+                    buf[base - x] = row[x]
             if shape and pos:
                 px, py = pos
-                for ry in range(len(shape)):
-                    for rx in range(len(shape[0])):
-                        if shape[ry][rx]:
-                            gx = px + rx; gy = py + ry
-                            if 0 <= gx < W and 0 <= gy < H:
-                                pixels[gy][gx] = val
-            return pixels
-
-        def draw_pixels(pixels):
-            for y in range(H):
-                for x in range(W):
-                    color = pixels[y][x]
-                    self.display.pixel(y, x, color)
-
+                shape.draw(buf, W, H, W - px - shape.w, py, val, mirror=True)
 
         def flash_lines_and_clear(grid, lines, flashes=2, delay=0.12):
-            for _ in range(flashes):
-                temp = compose_pixels(grid, None, None)
-                for y in lines:
-                    for x in range(W):
-                        temp[y][x] = 0
-                draw_pixels(temp)
-                time.sleep(delay)
-
-                temp = compose_pixels(grid, None, None)
-                for y in lines:
-                    for x in range(W):
-                        temp[y][x] = PALETTE.get('O', 150)
-                draw_pixels(temp)
-                time.sleep(delay)
+            # 满行点亮后交给芯片硬件闪烁，CPU 只需睡眠
+            draw_board(grid)
+            buf = self.fb_buf
+            mask = bytearray(W * H)
+            lit = bytes((PALETTE.get('O', 150),)) * W
+            for y in lines:
+                buf[y * W:(y + 1) * W] = lit
+                mask[y * W:(y + 1) * W] = b"\x01" * W
+            self.flush()
+            self.blink_start(mask)
+            time.sleep(flashes * 2 * delay)
+            self.blink_stop()
 
             new_grid, cnt = clear_lines(grid)
             return new_grid, cnt
@@ -597,7 +897,8 @@ class GameContext:
                     return
 
                 if any(grid[0][x] != 0 for x in range(W)):
-                    draw_pixels([[0]*W for _ in range(H)])
+                    draw_board(empty_grid())
+                    self.flush()
                     time.sleep(0.3)
                     break
 
@@ -606,7 +907,7 @@ class GameContext:
                     rots = PIECES[key]
                     rot_idx = 0
                     shape = rots[rot_idx]
-                    px = (W - len(shape[0])) // 2
+                    px = (W - shape.w) // 2
                     py = 0
 
                     best = choose_best(grid, key)
@@ -660,28 +961,25 @@ class GameContext:
                         cur = None
                         shape = None
 
-                pixels = compose_pixels(grid, shape, (px, py) if shape else None, cur["val"] if cur else 120)
-                draw_pixels(pixels)
+                self.mark(self.ST_UPDATE)
+                draw_board(grid, shape, (px, py) if shape else None, cur["val"] if cur else 120)
+                self.flush()
 
                 frame += 1
-                time.sleep(FRAME_DELAY)
+                self.frame_sleep(FRAME_DELAY)
                 
     def app_ble(self):
-        self.fb.font_set(0x12, 0, 1, 0)
+        self.font_set(0x12, 0, 1, 0)
         state = "idle"       
-        saved_text = ""       
         exit_flag = False   
 
         def show(text, brightness=100):
             self.fb.fill(0)
             self.fb.text(text, 0, 1, brightness)
-            for y in range(self.HEIGHT):
-                base = y * self.WIDTH
-                for x in range(self.WIDTH):
-                    self.display.pixel(y, self.WIDTH-x-1, self.fb_buf[base+x])
+            self.flush()
 
         def on_ble(event, data):
-            nonlocal state, saved_text, exit_flag
+            nonlocal state, exit_flag
 
             if event == "conn":
                 state = "connected"
@@ -689,12 +987,16 @@ class GameContext:
             elif event == "disc":
                 state = "idle"
 
-            elif event == "text":
-                saved_text = data
-                state = "saved"
+            elif event == "start":
+                state = "receiving"
 
-                with open("content.txt", "w") as f:
-                    f.write(saved_text)
+            elif event == "error":
+                state = "connected"
+
+            elif event == "saved":
+                # 接收端已边收边追加进消息库并校验，滚动文字先显示这条
+                state = "saved"
+                self._msg = len(self._store) - 1
 
                 if ble.conn_handle is not None:
                     try:
@@ -703,30 +1005,92 @@ class GameContext:
                         pass
                 exit_flag = True
 
-        ble = BLETextReceiver("LED-BLE", callback=on_ble)
+        ble = self.ble_open("LED-BLE", callback=on_ble, store=self.messages())
 
         while not exit_flag:
             if state == "idle":
                 show("B")      
             elif state == "connected":
                 show("C")          
-            elif state == "saved":
-                show("O")      
-                time.sleep(1) 
+            elif state == "receiving":
+                show("R")
 
             time.sleep(0.05)
+            ble.poll()
             if self.debounce_key():     
                 break
+        # 停掉接收端，免得在别的 App 运行时还往消息库里追加
+        self.ble_close(ble)
+
+        if state == "saved":
+            # 保存成功：“O” 由芯片闪烁 1 秒
+            show("O")
+            self.blink_start()
+            time.sleep(1)
+            self.blink_stop()
+
+    # =====================================================================
+    #                          App：BLE 实时帧流
+    # =====================================================================
+    def app_stream(self):
+        from frame_codec import FrameDecoder
+        self.font_set(0x12, 0, 1, 0)
+        dec = FrameDecoder(self.fb_buf)
+        shown = dec.fid
+        idle = None
+
+        def on_ble(event, data):
+            if event == "disc":
+                # 断开后回到等待画面，重连后从关键帧开始
+                dec.fid = -1
+
+        def on_packet(pkt):
+            # 只在下面主循环的 poll() 里调用（auto_poll=False），直接解码进 fb_buf；
+            # 不会打断 flush() 或画等待字形，画面不会撕裂或被覆盖
+            # 基准帧对不上就请求关键帧
+            if not dec.decode(pkt):
+                ble.send(b"F")
+
+        ble = self.ble_open("LED-STREAM", callback=on_ble, on_packet=on_packet,
+                            auto_poll=False)
+
+        while True:
+            # 一次取完积压的包，中间帧被后来的覆盖，只显示最新一帧（丢帧策略）
+            ble.poll()
+            if dec.fid < 0:
+                # 还没有帧：和 app_ble 一样显示 B（等待连接）/ C（已连接）
+                glyph = "B" if ble.conn_handle is None else "C"
+                if glyph != idle:
+                    self.fb.fill(0)
+                    self.fb.text(glyph, 0, 1, 100)
+                    self.flush()
+                    idle = glyph
+                    shown = -1
+                time.sleep_ms(20)
+            elif dec.fid != shown:
+                self.flush()
+                shown = dec.fid
+                idle = None
+                ble.send(bytes((ord("S"), shown)))
+                self.frame_end()
+            else:
+                time.sleep_ms(2)
+            if self.debounce_key():
+                break
+
+        # 不关掉的话接收端会继续广播，调度的 poll() 还会往后面 App 的 fb_buf 里解码
+        self.ble_close(ble)
 
     def run(self):
         #self.app_charge()
         self.app_battery()
+        apps = (self.app_fire, self.app_scroll_text, self.app_tetris_ai,
+                self.app_race, self.app_ble, self.app_stream)
         while True:
-            self.app_fire()
-            self.app_scroll_text()
-            self.app_tetris_ai()
-            self.app_race()
-            self.app_ble()
+            for app in apps:
+                app()
+                self.fade_out()
 
-GameContext().run()
+if __name__ == "__main__":
+    GameContext().run()
 
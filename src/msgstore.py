@@ -0,0 +1,268 @@
+"""
+消息库：多条文本追加写进同一个数据文件，另有定长记录的索引，
+切换消息只是按索引里的偏移 seek，不重写文件、不重新解析。
+
+    msgs.dat   追加写的文本（UTF-8）；没有被索引引用的字节是垃圾，压缩时回收
+    msgs.idx   每条 16 字节：<u32 偏移> <u32 长度> <u32 缓存键> <u8 字体> <u8 亮度> <u8 标志> <pad>
+
+先写数据后写索引，掉电最多丢掉最后一条还没写索引的消息。
+缓存键由文本的 crc32 和字体/亮度算出，滚动文字用它给预渲染的列缓存命名，
+压缩只移动数据，不影响缓存。
+"""
+import binascii
+import os
+import struct
+
+_REC = "<IIIBBBx"
+REC_SIZE = 16
+F_DELETED = 1
+
+FONT = 0x22             # 字体/亮度为 0 时用的默认值，与原滚动文字一致
+BRIGHTNESS = 60
+
+
+def _exists(path):
+    try:
+        os.stat(path)
+        return True
+    except OSError:
+        return False
+
+
+def _size(path):
+    try:
+        return os.stat(path)[6]
+    except OSError:
+        return 0
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _replace(src, dst):
+    try:
+        os.rename(src, dst)
+    except OSError:
+        # 部分文件系统不允许覆盖已有文件
+        _remove(dst)
+        os.rename(src, dst)
+
+
+def cache_key(crc, font=0, bright=0):
+    return binascii.crc32(bytes((font, bright)), crc) & 0xffffffff
+
+
+class MessageStore:
+    def __init__(self, base="msgs", max_entries=8, chunk=256):
+        """
+        max_entries: 超出时最早的一条被删除（轮换）
+        chunk: 后台压缩每步最多搬运的字节数
+        """
+        self.base = base
+        self.data = base + ".dat"
+        self.index = base + ".idx"
+        self.max_entries = max_entries
+        self._buf = bytearray(chunk)
+        self._pending = None    # 正在追加的消息的起始偏移
+        self._job = None        # 进行中的压缩
+        self._recover()
+        self._load()
+
+    # ---------------------------------------------------------------- 加载
+    def _recover(self):
+        # 压缩的提交点是 idx.new 改名完成；之前中断就丢弃，之后中断就补完
+        if _exists(self.index + ".new"):
+            if _exists(self.data + ".new"):
+                _replace(self.data + ".new", self.data)
+            _replace(self.index + ".new", self.index)
+        else:
+            _remove(self.data + ".new")
+        _remove(self.index + ".tmp")
+
+    def _load(self):
+        self._end = _size(self.data)
+        self._entries = []      # (记录号, 偏移, 长度, 缓存键, 字体, 亮度)
+        self._records = 0
+        live = 0
+        try:
+            f = open(self.index, "rb")
+        except OSError:
+            f = None
+        if f is not None:
+            with f:
+                rec = bytearray(REC_SIZE)
+                while f.readinto(rec) == REC_SIZE:
+                    off, n, key, font, bright, flags = struct.unpack(_REC, rec)
+                    if not flags & F_DELETED and off + n <= self._end:
+                        self._entries.append((self._records, off, n, key, font, bright))
+                        live += n
+                    self._records += 1
+        # 半条记录（写索引时掉电）之后再追加会错位，截掉
+        if _size(self.index) != self._records * REC_SIZE:
+            self._write_index(self.index, self._entries)
+            self._entries = [(i,) + e[1:] for i, e in enumerate(self._entries)]
+            self._records = len(self._entries)
+        self._garbage = self._end - live
+
+    def _write_index(self, path, entries):
+        tmp = self.index + ".tmp"
+        with open(tmp, "wb") as f:
+            for e in entries:
+                f.write(struct.pack(_REC, e[1], e[2], e[3], e[4], e[5], 0))
+        _replace(tmp, path)
+
+    # ---------------------------------------------------------------- 查询
+    def __len__(self):
+        return len(self._entries)
+
+    def entry(self, i):
+        """返回 (偏移, 长度, 缓存键, 字体, 亮度)，字体/亮度已替换默认值。"""
+        _, off, n, key, font, bright = self._entries[i]
+        return off, n, key, font or FONT, bright or BRIGHTNESS
+
+    def cache_path(self, i):
+        return "%s_%08x.col" % (self.base, self._entries[i][3])
+
+    def chars(self, i):
+        """逐字读出第 i 条，先 seek 到偏移，只读这条的字节。"""
+        off, n = self._entries[i][1:3]
+        b = bytearray(4)
+        mv = memoryview(b)
+        with open(self.data, "rb") as f:
+            f.seek(off)
+            while n > 0:
+                if f.readinto(mv[:1]) != 1:
+                    return
+                c = b[0]
+                k = 1 if c < 0x80 else 2 if c < 0xe0 else 3 if c < 0xf0 else 4
+                if k > n or k > 1 and f.readinto(mv[1:k]) != k - 1:
+                    return
+                n -= k
+                try:
+                    c = str(b[:k], "utf-8")
+                except UnicodeError:
+                    c = "?"
+                yield c
+
+    # ---------------------------------------------------------------- 追加
+    def begin(self):
+        """开始追加一条，返回以追加方式打开的数据文件，写完由调用者关闭。"""
+        self.abort()
+        self._cancel_compact()
+        self._pending = self._end
+        return open(self.data, "ab")
+
+    def commit(self, length, crc, font=0, bright=0):
+        """数据已写入并关闭后调用，写索引记录；返回新消息的序号。"""
+        off = self._pending
+        self._pending = None
+        self._end = _size(self.data)
+        if off + length > self._end:
+            self._garbage += self._end - off
+            raise OSError("short write")
+        self._garbage += self._end - off - length
+        key = cache_key(crc, font, bright)
+        with open(self.index, "ab") as f:
+            f.write(struct.pack(_REC, off, length, key, font, bright, 0))
+        self._entries.append((self._records, off, length, key, font, bright))
+        self._records += 1
+        while len(self._entries) > self.max_entries:
+            self.remove(0)
+        return len(self._entries) - 1
+
+    def abort(self):
+        """放弃正在追加的消息，已写的字节留作垃圾。"""
+        if self._pending is not None:
+            self._pending = None
+            end = _size(self.data)
+            self._garbage += end - self._end
+            self._end = end
+
+    def append(self, data, font=0, bright=0):
+        f = self.begin()
+        try:
+            f.write(data)
+        finally:
+            f.close()
+        return self.commit(len(data), binascii.crc32(data) & 0xffffffff, font, bright)
+
+    def remove(self, i):
+        rec, off, n, key = self._entries.pop(i)[:4]
+        self._cancel_compact()
+        # 只改标志字节，不移动数据
+        with open(self.index, "r+b") as f:
+            f.seek(rec * REC_SIZE + 14)
+            f.write(bytes((F_DELETED,)))
+        self._garbage += n
+        for e in self._entries:
+            if e[3] == key:
+                return
+        _remove("%s_%08x.col" % (self.base, key))
+
+    # ---------------------------------------------------------------- 压缩
+    def needs_compact(self):
+        live = self._end - self._garbage
+        return self._garbage > 0 and (self._garbage >= 4096 or self._garbage > live)
+
+    def compact_step(self):
+        """
+        后台压缩的一步：最多搬运 chunk 字节到新数据文件，可在帧间隙反复调用。
+        返回 True 表示已搬完、等待 swap()；没有要做的返回 False。
+        """
+        job = self._job
+        if job is None:
+            if self._pending is not None or not self.needs_compact():
+                return False
+            job = self._job = [open(self.data + ".new", "wb"), 0, 0, 0, []]
+        dst, k, pos, out, placed = job
+        entries = self._entries
+        if k >= len(entries):
+            return True
+        _, off, n = entries[k][:3]
+        step = min(len(self._buf), n - pos)
+        mv = memoryview(self._buf)[:step]
+        with open(self.data, "rb") as src:
+            src.seek(off + pos)
+            src.readinto(mv)
+        dst.write(mv)
+        pos += step
+        if pos >= n:
+            placed.append((k,) + (out,) + entries[k][2:])
+            out += n
+            k += 1
+            pos = 0
+        job[1] = k
+        job[2] = pos
+        job[3] = out
+        return k >= len(entries)
+
+    def swap(self):
+        """
+        压缩搬完后换上新文件。调用时不能有打开的读句柄（滚动文字在两条消息之间调用）。
+        返回是否换了文件。
+        """
+        job = self._job
+        if job is None or job[1] < len(self._entries):
+            return False
+        self._job = None
+        job[0].close()
+        placed = job[4]
+        self._write_index(self.index + ".new", placed)  # 提交点
+        _replace(self.data + ".new", self.data)
+        _replace(self.index + ".new", self.index)
+        self._entries = placed
+        self._records = len(placed)
+        self._end = job[3]
+        self._garbage = 0
+        return True
+
+    def _cancel_compact(self):
+        job = self._job
+        if job is not None:
+            self._job = None
+            job[0].close()
+            _remove(self.data + ".new")
@@ -0,0 +1,121 @@
+import gc, time
+
+UPDATE = 0
+RENDER = 1
+FLUSH = 2
+SLEEP = 3
+STAGE_NAMES = ("upd", "rnd", "fl", "slp")
+
+
+class CountingI2C:
+    """包一层 I2C，只统计事务次数，其余原样转发。"""
+
+    def __init__(self, i2c):
+        self.i2c = i2c
+        self.tx = 0
+
+    def writeto_mem(self, addr, reg, buf):
+        self.tx += 1
+        return self.i2c.writeto_mem(addr, reg, buf)
+
+    def readfrom_mem(self, addr, reg, n):
+        self.tx += 1
+        return self.i2c.readfrom_mem(addr, reg, n)
+
+    def __getattr__(self, name):
+        return getattr(self.i2c, name)
+
+
+class Profiler:
+    """
+    帧分段计时：update / render / flush / sleep（ticks_us），
+    并统计 GC 次数、I2C 事务数和堆占用，按 period_ms 汇总一次。
+
+    mode:
+        "overlay" - 在点阵顶部两行画 FPS 条和堆占用条（画在副本上，不改 App 的 fb_buf）
+        "print"   - 串口打印
+        "ble"     - 通过 sink(bytes) 发出（BLE UART TX notify）
+    """
+
+    def __init__(self, display, mode="overlay", sink=None, period_ms=1000):
+        self.display = display
+        self.mode = mode
+        self.sink = sink
+        self.period_ms = period_ms
+        self.i2c = CountingI2C(display.i2c)
+        display.i2c = self.i2c
+        self.acc = [0, 0, 0, 0]
+        self.frames = 0
+        self.gc_count = 0
+        self.last_alloc = gc.mem_alloc()
+        self.fps = 0
+        self.heap_pct = 0
+        self._overlay_buf = None
+        self.t = time.ticks_us()
+        self.t_report = time.ticks_ms()
+
+    def close(self):
+        # 恢复原始总线，关闭后没有任何额外开销
+        self.display.i2c = self.i2c.i2c
+
+    def mark(self, stage):
+        t = time.ticks_us()
+        self.acc[stage] += time.ticks_diff(t, self.t)
+        self.t = t
+
+    def frame(self):
+        self.frames += 1
+        alloc = gc.mem_alloc()
+        if alloc < self.last_alloc:
+            self.gc_count += 1
+        self.last_alloc = alloc
+
+        now = time.ticks_ms()
+        elapsed = time.ticks_diff(now, self.t_report)
+        if elapsed >= self.period_ms:
+            self.report(elapsed, alloc)
+            self.t_report = now
+        # 汇报本身的耗时不计入下一帧
+        self.t = time.ticks_us()
+
+    def report(self, elapsed, alloc):
+        n = self.frames or 1
+        free = gc.mem_free()
+        self.fps = self.frames * 1000 // elapsed
+        self.heap_pct = alloc * 100 // (alloc + free)
+        if self.mode != "overlay":
+            line = "fps %d" % self.fps
+            for i in range(4):
+                line += " %s %d" % (STAGE_NAMES[i], self.acc[i] // n)
+            line += " gc %d i2c %d heap %d/%d\n" % (
+                self.gc_count, self.i2c.tx // n, alloc, alloc + free)
+            if self.mode == "ble":
+                if self.sink:
+                    self.sink(line.encode())
+            else:
+                print(line, end="")
+        for i in range(4):
+            self.acc[i] = 0
+        self.frames = 0
+        self.gc_count = 0
+        self.i2c.tx = 0
+
+    def overlay(self, fb_buf, width, color=30):
+        """
+        把 fb_buf 拷进自己的缓冲再画条，返回这个缓冲用于刷屏。
+        不写回 fb_buf：不是每帧都重画顶部两行的 App（如火焰）关掉剖析后不会残留。
+        """
+        buf = self._overlay_buf
+        if buf is None or len(buf) != len(fb_buf):
+            buf = self._overlay_buf = bytearray(len(fb_buf))
+        buf[:] = fb_buf
+        self.draw_overlay(buf, width, color)
+        return buf
+
+    def draw_overlay(self, fb_buf, width, color=30):
+        """第 0 行：FPS（每格 5 fps），第 1 行：堆占用百分比。"""
+        fps_cols = min(width, self.fps // 5)
+        heap_cols = self.heap_pct * width // 100
+        for x in range(width):
+            fb_buf[x] = color if x < fps_cols else 0
+            fb_buf[width + x] = color if x < heap_cols else 0
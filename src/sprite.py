@@ -0,0 +1,63 @@
+"""
+精灵：0/1 形状预先编译成每行的连续段 (dy, dx, 长度)，画进行优先的帧缓冲
+（fb_buf）时每段一次切片赋值；纯色填充串按颜色缓存，绘制时不分配内存。
+cells 给游戏逻辑（碰撞、落定）用，只含实心格。
+"""
+
+
+class Sprite:
+    def __init__(self, shape):
+        self.h = len(shape)
+        self.w = len(shape[0])
+        runs = []
+        cells = []
+        for dy in range(self.h):
+            row = shape[dy]
+            x = 0
+            while x < self.w:
+                if row[x]:
+                    start = x
+                    while x < self.w and row[x]:
+                        cells.append((x, dy))
+                        x += 1
+                    runs.append((dy, start, x - start))
+                else:
+                    x += 1
+        self.runs = tuple(runs)
+        self.cells = tuple(cells)
+        self._fills = {}
+
+    def _fill(self, color):
+        f = self._fills.get(color)
+        if f is None:
+            f = tuple(bytes((color,)) * n for n in range(self.w + 1))
+            self._fills[color] = f
+        return f
+
+    def draw(self, buf, width, height, x, y, color, mirror=False):
+        """左上角画在 (x, y)；mirror 为左右镜像。超出缓冲的部分被裁掉。"""
+        fill = self._fill(color)
+        w = self.w
+        if 0 <= x and x + w <= width and 0 <= y and y + self.h <= height:
+            # 整个精灵在屏内：不需要逐段裁剪
+            for dy, dx, n in self.runs:
+                if mirror:
+                    dx = w - dx - n
+                a = (y + dy) * width + x + dx
+                buf[a:a + n] = fill[n]
+            return
+        for dy, dx, n in self.runs:
+            yy = y + dy
+            if yy < 0 or yy >= height:
+                continue
+            if mirror:
+                dx = w - dx - n
+            a = x + dx
+            b = a + n
+            if a < 0:
+                a = 0
+            if b > width:
+                b = width
+            if a < b:
+                base = yy * width
+                buf[base + a:base + b] = fill[b - a]
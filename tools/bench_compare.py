@@ -0,0 +1,50 @@
+"""
+对比两次 bench.py 的 JSON 结果。
+
+    python tools/bench_compare.py old.json new.json
+"""
+import json
+import sys
+
+FIELDS = (
+    ("p50 us", lambda r: r["frame_us"].get("p50", 0)),
+    ("p99 us", lambda r: r["frame_us"].get("p99", 0)),
+    ("i2c tx", lambda r: r["i2c_tx_per_frame"]),
+    ("i2c B", lambda r: r["i2c_bytes_per_frame"]),
+    ("alloc B", lambda r: r["alloc_per_frame"]),
+    ("peak heap", lambda r: r["peak_heap"]),
+    ("sleep us", lambda r: r.get("sleep_us_per_frame", 0)),
+)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def delta(old, new):
+    if not old:
+        return "    n/a"
+    return "%+6.1f%%" % ((new - old) * 100.0 / old)
+
+
+def main(argv):
+    if len(argv) != 3:
+        print(__doc__.strip())
+        return 2
+    old, new = load(argv[1]), load(argv[2])
+    print("%s -> %s" % (old.get("label") or argv[1], new.get("label") or argv[2]))
+    for app in sorted(set(old["apps"]) | set(new["apps"])):
+        a, b = old["apps"].get(app), new["apps"].get(app)
+        print("\n[%s]" % app)
+        if a is None or b is None:
+            print("  only in %s" % (argv[2] if a is None else argv[1]))
+            continue
+        for title, get in FIELDS:
+            va, vb = get(a), get(b)
+            print("  %-10s %12.1f %12.1f  %s" % (title, va, vb, delta(va, vb)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
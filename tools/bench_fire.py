@@ -0,0 +1,47 @@
+"""
+电脑上对比两种火焰帧源每帧的 CPU 时间：
+录制动画回放（fire.AnimPlayer + src/anim.bin）与程序生成（fire.Fire）。
+
+    python tools/bench_fire.py --frames 2000
+
+这里只比相对快慢，设备上的绝对耗时请用 src/bench.py。
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+import fire  # noqa: E402
+
+
+def measure(src, frames):
+    buf = bytearray(144)
+    for _ in range(20):
+        src.render(buf, 9)
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        src.render(buf, 9)
+    return (time.perf_counter() - t0) * 1e6 / frames
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--frames", type=int, default=2000)
+    args = ap.parse_args(argv)
+
+    with open(os.path.join(SRC, "anim.bin"), "rb") as f:
+        data = f.read()
+    # 用内存文件，排除磁盘缓存的影响；设备上读 flash 只会更慢
+    anim = measure(fire.AnimPlayer(io.BytesIO(data)), args.frames)
+    proc = measure(fire.Fire(), args.frames)
+    print("anim.bin playback  %8.1f us/frame" % anim)
+    print("procedural fire    %8.1f us/frame  (%.2fx)" % (proc, proc / anim))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+电脑上对比逐格循环与 sprite.Sprite 的绘制耗时：
+赛车 draw_car（含越界裁剪）、单个方块，以及俄罗斯方块的整帧绘制
+（原 compose_pixels + draw_pixels 对比 draw_board）。
+
+    python tools/bench_sprite.py --iterations 20000 --repeat 5
+
+每项取 repeat 次中最快的一次，减少电脑上的抖动。
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from sprite import Sprite  # noqa: E402
+
+W, H = 9, 16
+CAR_SHAPE = [[0, 1, 0], [1, 1, 1], [0, 1, 0], [1, 0, 1]]
+PIECE_T = [[0, 1, 0], [1, 1, 1]]
+
+
+def draw_car_loop(buf, x, y, color):
+    # app_race 的写法（含负坐标裁剪）
+    for dy in range(4):
+        if y + dy < 0 or y + dy >= H:
+            continue
+        for dx in range(3):
+            if CAR_SHAPE[dy][dx]:
+                xx = x + dx
+                if 0 <= xx < W:
+                    buf[(y + dy) * W + xx] = color
+
+
+def draw_piece_loop(pixels, shape, px, py, val):
+    # compose_pixels 原来的写法
+    for ry in range(len(shape)):
+        for rx in range(len(shape[0])):
+            if shape[ry][rx]:
+                gx = px + rx
+                gy = py + ry
+                if 0 <= gx < W and 0 <= gy < H:
+                    pixels[gy][gx] = val
+
+
+def tetris_frame_loop(buf, grid, shape, px, py):
+    # 原 compose_pixels + draw_pixels：先拼一个列表的列表，再镜像拷进 fb_buf
+    pixels = [[0] * W for _ in range(H)]
+    for y in range(H):
+        for x in range(W):
+            if grid[y][x]:
+                pixels[y][x] = grid[y][x]
+    draw_piece_loop(pixels, shape, px, py, 120)
+    for y in range(H):
+        row = pixels[y]
+        base = y * W + W - 1
+        for x in range(W):
+            buf[base - x] = row[x]
+
+
+def tetris_frame_sprite(buf, grid, spr, px, py):
+    # 现在的 draw_board：棋盘直接镜像写进 fb_buf，方块用 Sprite 画
+    for y in range(H):
+        row = grid[y]
+        base = y * W + W - 1
+        for x in range(W):
+            buf[base - x] = row[x]
+    spr.draw(buf, W, H, W - px - spr.w, py, 120, mirror=True)
+
+
+def timeit(fn, iterations, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for i in range(iterations):
+            fn(i)
+        t = (time.perf_counter() - t0) * 1e6 / iterations
+        if best is None or t < best:
+            best = t
+    return best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--iterations", type=int, default=20000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+    n = args.iterations
+    rep = args.repeat
+
+    buf = bytearray(W * H)
+    pixels = [[0] * W for _ in range(H)]
+    grid = [[0] * W for _ in range(H)]
+    for y in range(10, H):
+        for x in range(W):
+            if (x + y) % 3:
+                grid[y][x] = 60
+    car = Sprite(CAR_SHAPE)
+    piece = Sprite(PIECE_T)
+
+    rows = (
+        ("car, inside", lambda i: draw_car_loop(buf, 1, 5, 160),
+         lambda i: car.draw(buf, W, H, 1, 5, 160)),
+        ("car, clipped", lambda i: draw_car_loop(buf, 5, -2 + i % 20, 20),
+         lambda i: car.draw(buf, W, H, 5, -2 + i % 20, 20)),
+        ("tetris piece", lambda i: draw_piece_loop(pixels, PIECE_T, 3, 7, 150),
+         lambda i: piece.draw(buf, W, H, 3, 7, 150, mirror=True)),
+        ("tetris frame", lambda i: tetris_frame_loop(buf, grid, PIECE_T, 3, 7),
+         lambda i: tetris_frame_sprite(buf, grid, piece, 3, 7)),
+    )
+    print("%-14s %10s %10s" % ("", "loop us", "sprite us"))
+    for name, old, new in rows:
+        a = timeit(old, n, rep)
+        b = timeit(new, n, rep)
+        print("%-14s %10.2f %10.2f  (%.2fx)" % (name, a, b, a / b))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+通过 BLE 分帧协议把文本发给项链（追加进消息库，滚动文字轮流显示）。需要 bleak：
+
+    pip install bleak
+    python tools/ble_send.py message.txt            # 从文件
+    python tools/ble_send.py -t "你好，世界"          # 直接给文本
+    python tools/ble_send.py -t "Hi" --brightness 120  # 指定这条的亮度
+
+协议见 src/ble_text.py。
+"""
+import argparse
+import asyncio
+import struct
+import sys
+import zlib
+
+from bleak import BleakClient, BleakScanner
+
+UART_RX = "6E400002-B5A3-F393-E0A9-E50E24DCCA9E"
+UART_TX = "6E400003-B5A3-F393-E0A9-E50E24DCCA9E"
+
+CMD_START = 0x01
+CMD_CHUNK = 0x02
+CMD_END = 0x03
+CMD_ABORT = 0x04
+
+ERRORS = {1: "state", 2: "sequence", 3: "length", 4: "crc", 5: "io"}
+
+
+async def send(name, data, timeout=5.0, font=0, brightness=0):
+    dev = await BleakScanner.find_device_by_name(name, timeout=10.0)
+    if dev is None:
+        raise SystemExit("device %r not found" % name)
+
+    replies = asyncio.Queue()
+
+    async with BleakClient(dev) as client:
+        await client.start_notify(UART_TX, lambda _, v: replies.put_nowait(bytes(v)))
+
+        async def reply(kind):
+            while True:
+                r = await asyncio.wait_for(replies.get(), timeout)
+                if r[:1] == b"E":
+                    raise SystemExit("device error: %s" % ERRORS.get(r[1], r[1]))
+                if r.startswith(kind):
+                    return r
+
+        crc = zlib.crc32(data) & 0xffffffff
+        start = struct.pack("<BII", CMD_START, len(data), crc)
+        if font or brightness:
+            start += bytes((font, brightness))
+        await client.write_gatt_char(UART_RX, start, response=True)
+        k = await reply(b"K")
+        size, window = struct.unpack_from("<HB", k, 1)
+        # 主机侧的 MTU 也可能更小
+        size = min(size, client.mtu_size - 6)
+
+        seq = 0
+        for off in range(0, len(data), size):
+            pkt = struct.pack("<BH", CMD_CHUNK, seq & 0xffff) + data[off:off + size]
+            await client.write_gatt_char(UART_RX, pkt, response=False)
+            seq += 1
+            if seq % window == 0:
+                await reply(b"A")
+
+        await client.write_gatt_char(UART_RX, bytes([CMD_END]), response=True)
+        await reply(b"SAVED")
+    return seq
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("file", nargs="?", help="UTF-8 text file to send")
+    ap.add_argument("-t", "--text", help="text to send instead of a file")
+    ap.add_argument("-n", "--name", default="LED-BLE", help="advertised device name")
+    ap.add_argument("--font", type=lambda s: int(s, 0), default=0,
+                    help="font id for this message, e.g. 0x22 (0 = device default)")
+    ap.add_argument("--brightness", type=int, default=0,
+                    help="text brightness 1-255 (0 = device default)")
+    args = ap.parse_args()
+
+    if args.text is not None:
+        data = args.text.encode("utf-8")
+    elif args.file:
+        with open(args.file, "rb") as f:
+            data = f.read()
+    else:
+        ap.error("give a file or --text")
+
+    chunks = asyncio.run(send(args.name, data, font=args.font,
+                              brightness=args.brightness))
+    print("sent %d bytes in %d chunks" % (len(data), chunks))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
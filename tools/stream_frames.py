@@ -0,0 +1,59 @@
+"""
+实时帧流的测试画面，给 stream_send.py 和 stream_loopback.py 共用。
+同时把 src/ 加进 sys.path，以便在电脑上导入设备端的 frame_codec。
+"""
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import frame_codec  # noqa: E402
+
+WIDTH = 9
+HEIGHT = 16
+
+
+def wave(k):
+    """整屏正弦波，几乎每个像素每帧都变。"""
+    out = bytearray(WIDTH * HEIGHT)
+    for y in range(HEIGHT):
+        for x in range(WIDTH):
+            v = math.sin((x + k * 0.3) * 0.7) + math.sin((y - k * 0.2) * 0.5)
+            out[y * WIDTH + x] = int((v + 2) * 30)
+    return out
+
+
+def dot(k):
+    """一个亮点绕圈，每帧只有几个像素变化。"""
+    out = bytearray(WIDTH * HEIGHT)
+    x = int(4 + 3.5 * math.cos(k * 0.2))
+    y = int(7.5 + 7 * math.sin(k * 0.2))
+    out[y * WIDTH + x] = 200
+    return out
+
+
+_rng = random.Random(1)
+
+
+def noise(k):
+    """随机噪声，RLE/增量都压不动，只能发原始帧。"""
+    return bytearray(_rng.randrange(256) for _ in range(WIDTH * HEIGHT))
+
+
+PATTERNS = {"wave": wave, "dot": dot, "noise": noise}
+
+
+def raw_file(path):
+    """读取由连续 144 字节帧组成的文件，循环播放。"""
+    with open(path, "rb") as f:
+        data = f.read()
+    n = len(data) // frame_codec.FRAME_SIZE
+    if n == 0:
+        raise SystemExit("%s: no complete frames" % path)
+
+    def gen(k):
+        i = (k % n) * frame_codec.FRAME_SIZE
+        return bytearray(data[i:i + frame_codec.FRAME_SIZE])
+    return gen
@@ -0,0 +1,175 @@
+"""
+不用手机/BLE 的实时帧流回环测试：用真正的 frame_codec 编解码，
+在模拟链路（带宽、MTU、确认延迟）和模拟设备（接收环大小、刷屏耗时）上
+跑一段时间，统计吞吐、端到端延迟和各环节丢帧。
+
+    python tools/stream_loopback.py --pattern wave --fps 60 --link-kbps 80
+"""
+import argparse
+import sys
+import time
+
+from stream_frames import PATTERNS, frame_codec
+
+STEP = 0.0005           # 模拟时间步长（秒）
+ATT_OVERHEAD = 3 + 4    # ATT 头 + L2CAP 头
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, len(s) * p // 100)]
+
+
+def simulate(pattern, fps, seconds, link_kbps, mtu, ring, flush_ms, poll_ms,
+             ack_ms, max_inflight, keyframe_every):
+    gen = PATTERNS[pattern]
+    limit = mtu - 3
+    bps = link_kbps * 1000 / 8
+
+    buf = bytearray(frame_codec.FRAME_SIZE)
+    dec = frame_codec.FrameDecoder(buf)
+    decode_time = 0.0
+
+    t = 0.0
+    k = 0
+    fid = 0
+    prev = None             # 发送端认为设备当前的帧
+    prev_id = 0
+    need_key = True
+    inflight = {}           # 帧号 -> 生成时间
+    link = []               # [包, 剩余字节]
+    ring_pkts = []
+    ring_bytes = 0
+    acks = []               # (到达发送端时间, 帧号)
+    busy_until = 0.0
+    next_poll = 0.0
+    pending_show = None     # (刷完的时间, 帧号)
+
+    st = dict(generated=0, sender_skipped=0, too_big=0, ring_dropped=0,
+              superseded=0, rejected=0, shown=0, bytes=0, packets=0)
+    latency = []
+
+    while t < seconds:
+        # 发送端：按 fps 产生帧，未确认的帧太多就跳过（发送端丢帧）
+        while k / fps <= t:
+            frame = gen(k)
+            k += 1
+            st["generated"] += 1
+            if len(inflight) >= max_inflight:
+                st["sender_skipped"] += 1
+                continue
+            key = need_key or prev is None or (keyframe_every and fid % keyframe_every == 0)
+            pkt = frame_codec.encode(frame, None if key else prev, fid, prev_id, limit)
+            if pkt is None:
+                st["too_big"] += 1
+                continue
+            need_key = False
+            link.append([pkt, len(pkt) + ATT_OVERHEAD])
+            inflight[fid & 0xff] = t
+            st["bytes"] += len(pkt)
+            st["packets"] += 1
+            prev, prev_id = frame, fid
+            fid = (fid + 1) & 0xff
+
+        # 链路：按带宽逐包发送，到达时放进设备接收环
+        budget = bps * STEP
+        while link and budget > 0:
+            head = link[0]
+            used = min(budget, head[1])
+            head[1] -= used
+            budget -= used
+            if head[1] <= 0:
+                link.pop(0)
+                pkt = head[0]
+                if ring_bytes + len(pkt) + 3 >= ring:
+                    st["ring_dropped"] += 1
+                    inflight.pop(pkt[1], None)
+                else:
+                    ring_pkts.append(pkt)
+                    ring_bytes += len(pkt) + 3
+
+        # 设备：刷屏完成
+        if pending_show and t >= pending_show[0]:
+            done_t, shown = pending_show
+            pending_show = None
+            st["shown"] += 1
+            acks.append((done_t + ack_ms / 1000, shown))
+
+        # 设备：poll 取完环里的包，只刷最新一帧
+        if t >= busy_until and t >= next_poll:
+            before = dec.fid
+            decoded = []
+            for pkt in ring_pkts:
+                t0 = time.perf_counter()
+                ok = dec.decode(pkt)
+                decode_time += time.perf_counter() - t0
+                if ok:
+                    decoded.append(pkt[1])
+                else:
+                    st["rejected"] += 1
+                    acks.append((t + ack_ms / 1000, None))
+            ring_pkts = []
+            ring_bytes = 0
+            if dec.fid != before and decoded:
+                st["superseded"] += len(decoded) - 1
+                busy_until = t + flush_ms / 1000
+                pending_show = (busy_until, dec.fid)
+                for f in decoded[:-1]:
+                    inflight.pop(f, None)
+                # 延迟从生成算到刷屏完成
+                gen_t = inflight.get(dec.fid)
+                if gen_t is not None:
+                    latency.append(busy_until - gen_t)
+            next_poll = t + poll_ms / 1000
+
+        # 发送端收到确认（"S" 帧号 / "F" 请求关键帧）
+        while acks and acks[0][0] <= t:
+            _, f = acks.pop(0)
+            if f is None:
+                need_key = True
+                inflight.clear()
+            else:
+                inflight.pop(f, None)
+
+        t += STEP
+
+    st["shown_fps"] = st["shown"] / seconds
+    st["throughput_Bps"] = st["bytes"] / seconds
+    st["avg_packet"] = st["bytes"] / max(1, st["packets"])
+    st["latency_ms_p50"] = percentile(latency, 50) * 1000
+    st["latency_ms_p90"] = percentile(latency, 90) * 1000
+    st["latency_ms_max"] = max(latency) * 1000 if latency else 0.0
+    st["host_decode_us"] = decode_time * 1e6 / max(1, dec.received)
+    return st
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--pattern", choices=sorted(PATTERNS), default="wave")
+    ap.add_argument("--fps", type=float, default=50)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--link-kbps", type=float, default=100, help="effective BLE write throughput")
+    ap.add_argument("--mtu", type=int, default=247)
+    ap.add_argument("--ring", type=int, default=4096, help="device receive ring size (bytes)")
+    ap.add_argument("--flush-ms", type=float, default=4.0, help="device fb_buf -> I2C flush time")
+    ap.add_argument("--poll-ms", type=float, default=2.0)
+    ap.add_argument("--ack-ms", type=float, default=7.5, help="notify delay back to the sender")
+    ap.add_argument("--max-inflight", type=int, default=3)
+    ap.add_argument("--keyframe-every", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    st = simulate(args.pattern, args.fps, args.seconds, args.link_kbps, args.mtu,
+                  args.ring, args.flush_ms, args.poll_ms, args.ack_ms,
+                  args.max_inflight, args.keyframe_every)
+    for key, value in st.items():
+        if isinstance(value, float):
+            print("%-16s %10.2f" % (key, value))
+        else:
+            print("%-16s %10d" % (key, value))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
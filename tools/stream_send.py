@@ -0,0 +1,98 @@
+"""
+把测试画面或帧文件实时推给项链的 app_stream（BLE 名 LED-STREAM）。需要 bleak：
+
+    pip install bleak
+    python tools/stream_send.py --pattern dot --fps 30
+    python tools/stream_send.py --file frames.bin      # 连续的 144 字节帧
+
+设备每刷一帧回 "S"<帧号>，发送端据此限制在途帧数并统计往返延迟；
+收到 "F" 时下一帧改发关键帧。
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from bleak import BleakClient, BleakScanner
+
+from stream_frames import PATTERNS, frame_codec, raw_file
+
+UART_RX = "6E400002-B5A3-F393-E0A9-E50E24DCCA9E"
+UART_TX = "6E400003-B5A3-F393-E0A9-E50E24DCCA9E"
+
+
+async def stream(name, gen, fps, seconds, max_inflight):
+    dev = await BleakScanner.find_device_by_name(name, timeout=10.0)
+    if dev is None:
+        raise SystemExit("device %r not found" % name)
+
+    inflight = {}
+    rtt = []
+    state = {"need_key": True}
+
+    def on_notify(_, value):
+        value = bytes(value)
+        if value[:1] == b"S" and len(value) > 1:
+            sent = inflight.pop(value[1], None)
+            if sent is not None:
+                rtt.append(time.perf_counter() - sent)
+        elif value[:1] == b"F":
+            state["need_key"] = True
+            inflight.clear()
+
+    async with BleakClient(dev) as client:
+        await client.start_notify(UART_TX, on_notify)
+        limit = client.mtu_size - 3
+        prev = None
+        prev_id = fid = 0
+        sent = skipped = nbytes = 0
+        start = time.perf_counter()
+        k = 0
+        while time.perf_counter() - start < seconds:
+            due = start + k / fps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            frame = gen(k)
+            k += 1
+            if len(inflight) >= max_inflight:
+                skipped += 1
+                continue
+            key = state["need_key"] or prev is None
+            pkt = frame_codec.encode(frame, None if key else prev, fid, prev_id, limit)
+            if pkt is None:
+                raise SystemExit("MTU %d too small for a full frame" % client.mtu_size)
+            state["need_key"] = False
+            inflight[fid] = time.perf_counter()
+            await client.write_gatt_char(UART_RX, pkt, response=False)
+            sent += 1
+            nbytes += len(pkt)
+            prev, prev_id = frame, fid
+            fid = (fid + 1) & 0xff
+        elapsed = time.perf_counter() - start
+
+    rtt.sort()
+    print("sent %d frames (%d skipped), %.1f fps, %.0f B/s, avg %.1f B/frame"
+          % (sent, skipped, sent / elapsed, nbytes / elapsed, nbytes / max(1, sent)))
+    if rtt:
+        print("round trip ms: p50 %.1f  p90 %.1f  max %.1f"
+              % (rtt[len(rtt) // 2] * 1000, rtt[len(rtt) * 9 // 10] * 1000, rtt[-1] * 1000))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--pattern", choices=sorted(PATTERNS), default="dot")
+    ap.add_argument("--file", help="raw file of consecutive 144-byte frames")
+    ap.add_argument("--fps", type=float, default=30)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--max-inflight", type=int, default=3)
+    ap.add_argument("-n", "--name", default="LED-STREAM")
+    args = ap.parse_args()
+
+    gen = raw_file(args.file) if args.file else PATTERNS[args.pattern]
+    asyncio.run(stream(args.name, gen, args.fps, args.seconds, args.max_inflight))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())